@@ -0,0 +1,177 @@
+"""
+Benchmark harness for the word frequency counter.
+
+Generates a synthetic corpus with a Zipf-distributed vocabulary, then runs
+word_freq_multithread_wordsplit.count_file() in quiet mode for every
+combination of backend, tokenization mode and segment count. Each
+configuration runs in a fresh Python process so its peak RSS is measured on
+its own. Results are written as JSON: MB/s, words/s, peak RSS and scaling
+efficiency relative to the smallest segment count of the same backend/mode.
+
+Example:
+
+    python benchmark.py --size-mb 200 --skew 1.1 --segments 1,2,4,8 --output bench.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+WORDS_PER_LINE = 12
+
+# ---------------------- Synthetic corpus ----------------------
+
+def make_vocabulary(size, rng):
+    vocab = set()
+    while len(vocab) < size:
+        vocab.add(''.join(rng.choices(LETTERS, k=rng.randint(2, 12))))
+    return sorted(vocab)
+
+def generate_corpus(path, size_mb, vocab_size, skew, seed=0):
+    # Word of rank r is drawn with probability proportional to 1 / r**skew;
+    # skew 0 gives a uniform vocabulary.
+    rng = random.Random(seed)
+    vocab = make_vocabulary(vocab_size, rng)
+    cum_weights = list(itertools.accumulate(1.0 / (rank ** skew) for rank in range(1, vocab_size + 1)))
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < target:
+            words = rng.choices(vocab, cum_weights=cum_weights, k=WORDS_PER_LINE * 1000)
+            lines = [' '.join(words[i:i + WORDS_PER_LINE])
+                     for i in range(0, len(words), WORDS_PER_LINE)]
+            block = '\n'.join(lines) + '\n'
+            f.write(block)
+            written += len(block)
+    return os.path.getsize(path)
+
+# ---------------------- Single configuration ----------------------
+
+def run_one(corpus, backend, mode, segments):
+    # Runs inside a fresh interpreter; prints one JSON result line.
+    sys.path.insert(0, HERE)
+    import word_freq_multithread_wordsplit as wf
+    wf.QUIET = True
+    size = os.path.getsize(corpus)
+    start = time.perf_counter()
+    counts = wf.count_file(corpus, segments, stream=(mode == 'stream'), backend=backend,
+                           num_workers=segments if backend == 'process' else None)
+    elapsed = time.perf_counter() - start
+    words = sum(counts.values())
+    # ru_maxrss is in KiB on Linux and bytes on macOS.
+    scale = 1 if sys.platform == 'darwin' else 1024
+    self_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    child_rss = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale
+    print(json.dumps({
+        'backend': backend,
+        'mode': mode,
+        'segments': segments,
+        'seconds': elapsed,
+        'bytes': size,
+        'words': words,
+        'distinct_words': len(counts),
+        'mb_per_s': size / (1024 * 1024) / elapsed,
+        'words_per_s': words / elapsed,
+        'peak_rss_mb': self_rss / (1024 * 1024),
+        'peak_worker_rss_mb': child_rss / (1024 * 1024),
+    }))
+
+def measure(corpus, backend, mode, segments, repeat):
+    # Best of `repeat` runs, each in its own process.
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--run-one', corpus, backend, mode, str(segments)],
+            check=True, capture_output=True, text=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+def add_scaling(results):
+    # Efficiency = speedup over the smallest segment count / increase in segments.
+    groups = {}
+    for r in results:
+        groups.setdefault((r['backend'], r['mode']), []).append(r)
+    for group in groups.values():
+        base = min(group, key=lambda r: r['segments'])
+        for r in group:
+            r['speedup'] = base['seconds'] / r['seconds']
+            r['scaling_efficiency'] = r['speedup'] * base['segments'] / r['segments']
+
+def parse_list(text, cast=str):
+    return [cast(item) for item in text.split(',') if item]
+
+def main():
+    if len(sys.argv) == 6 and sys.argv[1] == '--run-one':
+        run_one(sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5]))
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark the word frequency counter.")
+    parser.add_argument('--corpus', help="Existing text file to use instead of generating one.")
+    parser.add_argument('--size-mb', type=float, default=50, help="Synthetic corpus size (default 50).")
+    parser.add_argument('--vocab', type=int, default=50000, help="Distinct words (default 50000).")
+    parser.add_argument('--skew', type=float, default=1.0,
+                        help="Zipf exponent of the word distribution; 0 = uniform (default 1.0).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--segments', default='1,2,4,8', help="Comma-separated segment counts.")
+    parser.add_argument('--backends', default='thread,process', help="Comma-separated backends.")
+    parser.add_argument('--modes', default='memory,stream',
+                        help="Tokenization modes: memory (read whole file) and/or stream (mmap ranges).")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per configuration; best is kept.")
+    parser.add_argument('--output', help="Write JSON here instead of stdout.")
+    args = parser.parse_args()
+
+    tmpdir = None
+    corpus = args.corpus
+    if corpus is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        corpus = os.path.join(tmpdir.name, 'corpus.txt')
+        print(f"Generating {args.size_mb} MB corpus (vocab={args.vocab}, skew={args.skew})...",
+              file=sys.stderr)
+        generate_corpus(corpus, args.size_mb, args.vocab, args.skew, args.seed)
+
+    results = []
+    try:
+        for backend in parse_list(args.backends):
+            # The process backend always counts byte ranges.
+            modes = ['stream'] if backend == 'process' else parse_list(args.modes)
+            for mode in modes:
+                for segments in parse_list(args.segments, int):
+                    print(f"Running backend={backend} mode={mode} segments={segments}...",
+                          file=sys.stderr)
+                    results.append(measure(corpus, backend, mode, segments, args.repeat))
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+    add_scaling(results)
+
+    report = {
+        'corpus': {
+            'path': args.corpus,
+            'bytes': results[0]['bytes'] if results else None,
+            'vocab': None if args.corpus else args.vocab,
+            'skew': None if args.corpus else args.skew,
+        },
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+On-disk cache of per-file word counts for corpus mode.
+
+Each input file gets one JSON entry, named after a hash of its absolute path
+and counting mode, recording the file's size, mtime and SHA-256 along with its
+counts. An entry is reused when size and mtime still match. When only the mtime changed (the file
+was touched or copied) the content hash is checked before the entry is thrown
+away, so the file is re-tokenized only if its bytes really changed. The hash is
+computed by the caller's counting task (see expected_digest and revalidate),
+so it runs in the worker pool rather than serially in the main thread.
+
+prune() drops the entries of files that no longer exist, and those of files
+under the corpus root that were not part of this run.
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+
+from heavy_hitters import MisraGries
+
+def counts_mode(capacity=None):
+    # Exact and approximate results must never be mixed up in the cache.
+    return f"misra-gries:{capacity}" if capacity else "exact"
+
+def encode_counts(freq):
+    if isinstance(freq, MisraGries):
+        return {'counts': dict(freq.counts), 'total': freq.total, 'error': freq.error}
+    return {'counts': dict(freq)}
+
+def decode_counts(data, capacity=None):
+    if not capacity:
+        return Counter(data['counts'])
+    freq = MisraGries(capacity)
+    freq.counts = Counter(data['counts'])
+    freq.total = data['total']
+    freq.error = data['error']
+    return freq
+
+class CountCache:
+    def __init__(self, cache_dir, capacity=None):
+        self.cache_dir = cache_dir
+        self.capacity = capacity
+        self.mode = counts_mode(capacity)
+        self.hits = 0
+        self.misses = 0
+        self.unverified = {}  # path -> entry whose mtime changed but size did not
+        self.seen = set()  # entry files looked up or stored in this run
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_path(self, path):
+        key = f"{os.path.abspath(path)}\0{self.mode}"
+        key = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + '.json')
+
+    def _load(self, path):
+        self.seen.add(self._entry_path(path))
+        try:
+            with open(self._entry_path(path), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get('path') != os.path.abspath(path) or entry.get('mode') != self.mode:
+            return None
+        return entry
+
+    def lookup(self, path, st):
+        # Return the cached counts for `path` (stat result `st`) or None. If
+        # only the mtime changed, expected_digest(path) is then the hash the
+        # contents must still have for revalidate(path, st) to reuse the entry.
+        entry = self._load(path)
+        if entry is None or entry['size'] != st.st_size:
+            self.misses += 1
+            return None
+        if entry['mtime_ns'] != st.st_mtime_ns:
+            self.unverified[path] = entry
+            return None
+        self.hits += 1
+        return decode_counts(entry, self.capacity)
+
+    def expected_digest(self, path):
+        entry = self.unverified.get(path)
+        return entry['sha256'] if entry else None
+
+    def revalidate(self, path, st):
+        # The contents hashed to expected_digest(path): keep the entry under the new mtime.
+        entry = self.unverified.pop(path)
+        entry['mtime_ns'] = st.st_mtime_ns
+        self._write(path, entry)
+        self.hits += 1
+        return decode_counts(entry, self.capacity)
+
+    def store(self, path, st, digest, freq):
+        if self.unverified.pop(path, None) is not None:
+            self.misses += 1
+        entry = {
+            'path': os.path.abspath(path),
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha256': digest,
+            'mode': self.mode,
+        }
+        entry.update(encode_counts(freq))
+        self.seen.add(self._entry_path(path))
+        self._write(path, entry)
+
+    def prune(self, root):
+        # Remove entries whose file is gone, and entries in this mode for
+        # files under `root` that this run never looked up. Entries for other
+        # corpora sharing the cache directory are left alone.
+        root = os.path.join(os.path.abspath(root), '')
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            target = os.path.join(self.cache_dir, name)
+            if not name.endswith('.json') or target in self.seen:
+                continue
+            try:
+                with open(target, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                continue
+            path = entry.get('path')
+            if not isinstance(path, str):
+                continue
+            if not os.path.exists(path) or (entry.get('mode') == self.mode and path.startswith(root)):
+                try:
+                    os.remove(target)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def _write(self, path, entry):
+        # Write to a temporary file and rename so a crash never leaves a torn entry.
+        target = self._entry_path(path)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp, target)
@@ -0,0 +1,55 @@
+"""
+Bounded-memory heavy hitters for the word frequency counter.
+
+MisraGries keeps at most `capacity` counters no matter how many distinct words
+it sees. Estimated counts never exceed the true counts, and undercount them by
+at most `error`, which is itself guaranteed to be <= total / (capacity + 1).
+Two summaries merge into one with the same guarantee, so per-segment summaries
+can be combined exactly like per-segment Counters.
+"""
+import heapq
+from collections import Counter
+
+class MisraGries:
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be a positive integer")
+        self.capacity = capacity
+        self.counts = Counter()
+        self.total = 0  # number of words summarized
+        self.error = 0  # maximum undercount of any estimate
+
+    def update(self, counts):
+        # Fold in a mapping of word -> count (e.g. one chunk's Counter) or
+        # another MisraGries summary, then trim back to `capacity` counters.
+        if isinstance(counts, MisraGries):
+            self.total += counts.total
+            self.error += counts.error
+            counts = counts.counts
+        else:
+            self.total += sum(counts.values())
+        self.counts.update(counts)
+        self._prune()
+
+    def _prune(self):
+        if len(self.counts) <= self.capacity:
+            return
+        # Subtract the (capacity+1)-th largest count from every counter and
+        # drop those that reach zero. At least capacity+1 counters shrink by
+        # `cut` each time, which bounds the total error by total/(capacity+1).
+        cut = heapq.nlargest(self.capacity + 1, self.counts.values())[-1]
+        self.counts = Counter({w: c - cut for w, c in self.counts.items() if c > cut})
+        self.error += cut
+
+    def most_common(self, n=None):
+        return self.counts.most_common(n)
+
+    def error_bound(self):
+        # Worst-case undercount guaranteed by the algorithm for this many words.
+        return self.total // (self.capacity + 1)
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __repr__(self):
+        return f"MisraGries(capacity={self.capacity}, total={self.total}, error={self.error})"
@@ -2,40 +2,331 @@
 Word Frequency Counter Using Multithreading
 
 This script splits the file into N segments by words (not characters), processes each segment in a separate thread, and outputs both intermediate and final word frequency counts.
+
+With --stream the file is memory-mapped instead of read into memory. It is split
+into N byte ranges that end on whitespace (or punctuation, if a stretch has no
+whitespace), and each thread tokenizes and counts
+only its own range in fixed-size chunks, so memory stays bounded by the chunk
+size rather than the file size.
+
+With --backend process the byte ranges are counted in a pool of worker
+processes (one per core) so tokenization is not serialized by the GIL. Workers
+map the file themselves and receive only the path and their byte ranges. Each
+worker merges the counts of its own ranges before returning, so only one
+Counter per worker is pickled back and merged pairwise as a tree.
+
+With --top K only the K most frequent words are printed. Adding --approx keeps
+a fixed-size Misra-Gries summary (see heavy_hitters.py) per segment instead of
+a Counter of every distinct word, so memory stays fixed on high-cardinality
+inputs; the error bound of the reported counts is printed with the result.
+
+If <input_file> is a directory or a glob pattern, every matching file is
+counted as one task spread across the workers, and each file's counts are kept
+in an on-disk cache (see count_cache.py). Re-runs only re-tokenize files whose
+contents changed and merge the cached counts for the rest; cache entries for
+files that were deleted or renamed are dropped.
+
+--quiet suppresses the per-thread intermediate counts, which dominate the
+runtime on large inputs. benchmark.py uses count_file() in this mode to measure
+throughput across backends and segment counts.
 """
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import glob
+import hashlib
+import mmap
+import os
 import sys
 import threading
 from collections import Counter
 import re
 
+from count_cache import CountCache
+from heavy_hitters import MisraGries
+
+WORD_RE = re.compile(r'\b\w+\b')
+WHITESPACE_RE = re.compile(rb'\s')
+NON_WORD_RE = re.compile(rb'[^0-9A-Za-z_\x80-\xff]')  # ASCII bytes that never occur in a word
+NON_WORD_TEXT_RE = re.compile(r'\W')
+DEFAULT_CHUNK_SIZE = 1 << 20  # 1 MiB per read in streaming mode
+MAX_CHUNK_SCAN = 4  # chunk sizes to look past a chunk for a boundary before carrying it over
+MAX_WORD_CHUNKS = 16  # chunk sizes a single word may span before it is cut in two
+TEXT_SCAN = 1 << 16  # bytes decoded at a time when looking for a non-ASCII boundary
+QUIET = False  # suppress intermediate counts (--quiet)
+
+def report(message):
+    if not QUIET:
+        print(message)
+
 def count_words(words, result_list, index):
     freq = Counter(words)
     result_list[index] = freq
-    print(f"Thread {index+1} intermediate count: {dict(freq)}\n")
+    report(f"Thread {index+1} intermediate count: {dict(freq)}\n")
 
-def main():
-    if len(sys.argv) != 3:
-        print("Usage: python word_freq_multithread_wordsplit.py <input_file> <num_segments>")
-        sys.exit(1)
-    input_file = sys.argv[1]
-    try:
-        num_segments = int(sys.argv[2])
-        if num_segments < 1:
-            raise ValueError
-    except ValueError:
-        print("Number of segments must be a positive integer.")
-        sys.exit(1)
+# ---------------------- Streaming (memory-mapped) mode ----------------------
 
-    # Read file content
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            text = f.read()
-    except Exception as e:
-        print(f"Error reading file: {e}")
-        sys.exit(1)
+def next_boundary(buf, pos, end):
+    # First whitespace byte at or after pos, or else the first other ASCII
+    # non-word byte (minified or binary data), or else the first non-ASCII
+    # non-word character (text with no ASCII separators, such as CJK), or end.
+    # ASCII bytes never occur inside a multi-byte UTF-8 sequence, so cutting
+    # here never splits a word or a character.
+    match = WHITESPACE_RE.search(buf, pos, end) or NON_WORD_RE.search(buf, pos, end)
+    return match.start() if match else text_boundary(buf, pos, end)
+
+def char_start(buf, pos):
+    # Back up from pos to the start of the UTF-8 character it falls in.
+    while pos > 0 and pos < len(buf) and buf[pos] & 0xC0 == 0x80:
+        pos -= 1
+    return pos
+
+def text_boundary(buf, pos, end):
+    # Byte offset of the first non-word character at or after pos, decoding
+    # TEXT_SCAN bytes at a time, or end. surrogateescape maps undecodable
+    # bytes one-to-one, so offsets in the text map back to offsets in buf.
+    # Only whole characters are decoded: a character cut off at either end
+    # would decode as surrogates, which count as non-word characters.
+    last = char_start(buf, end)
+    while pos < last and buf[pos] & 0xC0 == 0x80:
+        pos += 1
+    while pos < last:
+        stop = char_start(buf, min(pos + TEXT_SCAN, last))
+        if stop <= pos:
+            stop = last
+        text = buf[pos:stop].decode('utf-8', errors='surrogateescape')
+        match = NON_WORD_TEXT_RE.search(text)
+        if match:
+            return pos + len(text[:match.start()].encode('utf-8', errors='surrogateescape'))
+        pos = stop
+    return end
+
+def split_ranges(buf, num_segments):
+    size = len(buf)
+    bounds = [0]
+    for i in range(1, num_segments):
+        pos = max(size * i // num_segments, bounds[-1])
+        bounds.append(next_boundary(buf, pos, size))
+    bounds.append(size)
+    return [(bounds[i], bounds[i + 1]) for i in range(num_segments)]
+
+def iter_chunks(buf, start, end, chunk_size):
+    # A chunk is extended to the next boundary, but by at most MAX_CHUNK_SCAN
+    # chunk sizes. Past that the window is all one word, and its bytes are
+    # carried into the next chunk. A word longer than MAX_WORD_CHUNKS chunk
+    # sizes is cut at a character boundary and counted as two, so no chunk
+    # is ever larger than MAX_WORD_CHUNKS + MAX_CHUNK_SCAN + 1 chunk sizes.
+    pieces, carried = [], 0
+    while start < end:
+        stop = min(start + chunk_size, end)
+        if stop < end:
+            limit = min(stop + MAX_CHUNK_SCAN * chunk_size, end)
+            stop = next_boundary(buf, stop, limit)
+            if stop == limit < end:
+                if carried + stop - start <= MAX_WORD_CHUNKS * chunk_size:
+                    pieces.append(buf[start:stop])
+                    carried += stop - start
+                    start = stop
+                    continue
+                stop = char_start(buf, stop)
+        chunk = buf[start:stop]
+        if pieces:
+            pieces.append(chunk)
+            chunk = b''.join(pieces)
+            pieces, carried = [], 0
+        yield chunk
+        start = stop
+
+def new_counts(capacity=None):
+    # Exact counts by default; a fixed-size heavy-hitters summary in approx mode.
+    return MisraGries(capacity) if capacity else Counter()
+
+def as_dict(freq):
+    return dict(freq.counts) if isinstance(freq, MisraGries) else dict(freq)
+
+def count_range(buf, start, end, chunk_size=DEFAULT_CHUNK_SIZE, capacity=None):
+    freq = new_counts(capacity)
+    for chunk in iter_chunks(buf, start, end, chunk_size):
+        text = chunk.decode('utf-8', errors='replace').lower()
+        words = WORD_RE.findall(text)
+        freq.update(Counter(words) if capacity else words)
+    return freq
+
+def count_range_thread(buf, start, end, chunk_size, capacity, result_list, index):
+    freq = count_range(buf, start, end, chunk_size, capacity)
+    result_list[index] = freq
+    report(f"Thread {index+1} intermediate count: {as_dict(freq)}\n")
+
+def count_path_ranges(path, ranges, chunk_size=DEFAULT_CHUNK_SIZE, capacity=None):
+    # Process-pool entry point: map the file locally so only the ranges are
+    # pickled, and merge their counts here so only one Counter is sent back.
+    counts = []
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return new_counts(capacity)  # mmap cannot map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            for start, end in ranges:
+                counts.append(count_range(buf, start, end, chunk_size, capacity))
+    return tree_merge(counts, capacity)
+
+def merge_counters(a, b):
+    # Fold the smaller Counter (or MisraGries summary) into the larger one.
+    if len(a) < len(b):
+        a, b = b, a
+    a.update(b)
+    return a
+
+def tree_merge(counters, capacity=None):
+    # Merge partial counts pairwise, level by level, always folding the
+    # smaller side into the larger.
+    counters = list(counters)
+    if not counters:
+        return new_counts(capacity)
+    while len(counters) > 1:
+        merged = [merge_counters(a, b) for a, b in zip(counters[0:-1:2], counters[1::2])]
+        if len(counters) % 2:
+            merged.append(counters[-1])
+        counters = merged
+    return counters[0]
+
+def file_ranges(input_file, num_segments):
+    with open(input_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return [(0, 0)] * num_segments  # mmap cannot map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return split_ranges(buf, num_segments)
+
+def count_file_streaming(input_file, num_segments, chunk_size=DEFAULT_CHUNK_SIZE, capacity=None):
+    results = [new_counts(capacity) for _ in range(num_segments)]
+    with open(input_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return results  # mmap cannot map an empty file
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            threads = []
+            for i, (start, end) in enumerate(split_ranges(buf, num_segments)):
+                t = threading.Thread(target=count_range_thread,
+                                     args=(buf, start, end, chunk_size, capacity, results, i))
+                threads.append(t)
+                t.start()
+            for t in threads:
+                t.join()
+    return results
+
+def count_file_processes(input_file, num_segments, chunk_size=DEFAULT_CHUNK_SIZE,
+                         num_workers=None, capacity=None):
+    # Returns the already merged Counter. Each worker gets every n-th range
+    # (so uneven stretches of the file even out) and merges them itself;
+    # sending each range's Counter back to be merged would pickle every
+    # distinct word once per range.
+    ranges = file_ranges(input_file, num_segments)
+    num_workers = min(num_workers or os.cpu_count(), len(ranges))
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        futures = [executor.submit(count_path_ranges, input_file, ranges[i::num_workers], chunk_size, capacity)
+                   for i in range(num_workers)]
+        results = []
+        for i, future in enumerate(futures):
+            freq = future.result()
+            report(f"Worker {i+1} intermediate count: {as_dict(freq)}\n")
+            results.append(freq)
+    return tree_merge(results, capacity)
+
+# ---------------------- Corpus (multi-file) mode ----------------------
+
+GLOB_CHARS = '*?['
+
+def is_corpus(input_file):
+    # An existing file is never a pattern, even if its name is log[1].txt.
+    if os.path.isfile(input_file):
+        return False
+    return os.path.isdir(input_file) or any(c in input_file for c in GLOB_CHARS)
+
+def corpus_root(pattern):
+    # The directory a corpus lives under: the directory itself, or the part
+    # of a glob pattern before its first wildcard.
+    if os.path.isdir(pattern):
+        return pattern
+    first = min(pattern.index(c) for c in GLOB_CHARS if c in pattern)
+    return os.path.dirname(pattern[:first]) or '.'
+
+def expand_corpus(pattern):
+    if os.path.isdir(pattern):
+        paths = [os.path.join(root, name)
+                 for root, _, names in os.walk(pattern) for name in names]
+    else:
+        paths = glob.glob(pattern, recursive=True)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+def count_corpus_file(path, chunk_size=DEFAULT_CHUNK_SIZE, capacity=None, expected_digest=None,
+                      hash_contents=True):
+    # Count one whole file and, for the cache entry, hash the same mapped
+    # bytes (the digest is None without hash_contents). If the hash is
+    # `expected_digest` the cached counts still hold: return None instead of
+    # tokenizing.
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if st.st_size == 0:
+            digest = hashlib.sha256().hexdigest() if hash_contents else None
+            return (None if digest and digest == expected_digest else new_counts(capacity)), digest, st
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            digest = hashlib.sha256(buf).hexdigest() if hash_contents else None
+            if digest and digest == expected_digest:
+                return None, digest, st
+            return count_range(buf, 0, len(buf), chunk_size, capacity), digest, st
+
+def count_corpus(pattern, num_segments, chunk_size=DEFAULT_CHUNK_SIZE, backend='thread',
+                 num_workers=None, capacity=None, cache_dir=None):
+    paths = expand_corpus(pattern)
+    if not paths:
+        raise FileNotFoundError(f"no files match {pattern}")
+    cache = None
+    if cache_dir:
+        cache = CountCache(cache_dir, capacity)
+        # Never count the cache's own entries when it lives inside the corpus.
+        cache_root = os.path.join(os.path.abspath(cache_dir), '')
+        paths = [p for p in paths if not os.path.abspath(p).startswith(cache_root)]
+    results, pending = [], []
+    for path in paths:
+        cached = cache.lookup(path, os.stat(path)) if cache else None
+        if cached is None:
+            pending.append(path)
+        else:
+            results.append(cached)
+
+    if backend == 'process':
+        executor = ProcessPoolExecutor(max_workers=num_workers or os.cpu_count())
+    else:
+        executor = ThreadPoolExecutor(max_workers=num_segments)
+    counted = 0
+    with executor:
+        # Files that were only touched are hashed in the pool too, and
+        # tokenized only if their contents changed.
+        futures = [executor.submit(count_corpus_file, path, chunk_size, capacity,
+                                   cache.expected_digest(path) if cache else None, cache is not None)
+                   for path in pending]
+        for path, future in zip(pending, futures):
+            freq, digest, st = future.result()
+            if freq is None:
+                results.append(cache.revalidate(path, st))
+                continue
+            counted += 1
+            report(f"File {path} intermediate count: {as_dict(freq)}\n")
+            if cache:
+                cache.store(path, st, digest, freq)
+            results.append(freq)
+    final_count = tree_merge(results, capacity)
+    if cache:
+        cache.prune(corpus_root(pattern))
+    report(f"Corpus: {len(paths)} file(s), {len(paths) - counted} from cache, "
+           f"{counted} counted.")
+    return final_count
+
+# ---------------------- In-memory mode ----------------------
+
+def count_file_in_memory(input_file, num_segments):
+    with open(input_file, 'r', encoding='utf-8') as f:
+        text = f.read()
 
     # Split text into words
-    all_words = re.findall(r'\b\w+\b', text.lower())
+    all_words = WORD_RE.findall(text.lower())
     total_words = len(all_words)
     segment_size = total_words // num_segments
     segments = []
@@ -54,15 +345,113 @@ def main():
 
     for t in threads:
         t.join()
+    return results
 
+def count_file(input_file, num_segments, stream=False, chunk_size=DEFAULT_CHUNK_SIZE,
+               backend='thread', num_workers=None, capacity=None, cache_dir=None):
+    # Count a file (or corpus) with the selected mode and return the merged counts.
+    if is_corpus(input_file):
+        return count_corpus(input_file, num_segments, chunk_size, backend,
+                            num_workers, capacity, cache_dir)
+    if backend == 'process':
+        return count_file_processes(input_file, num_segments, chunk_size, num_workers, capacity)
+    if stream or capacity:
+        results = count_file_streaming(input_file, num_segments, chunk_size, capacity)
+    else:
+        results = count_file_in_memory(input_file, num_segments)
     # Consolidate results
-    final_count = Counter()
-    for freq in results:
-        final_count.update(freq)
+    return tree_merge(results, capacity)
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        description="Count word frequencies using multiple threads.")
+    parser.add_argument('input_file', help="Path to your text file.")
+    parser.add_argument('num_segments', help="Number of segments/threads to use (positive integer).")
+    parser.add_argument('--stream', action='store_true',
+                        help="Memory-map the file and count whitespace-aligned byte ranges "
+                             "in fixed-size chunks instead of reading it into memory.")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Bytes tokenized at a time in streaming mode (default {DEFAULT_CHUNK_SIZE}).")
+    parser.add_argument('--backend', choices=('thread', 'process'), default='thread',
+                        help="Count segments in threads (default) or in a process pool sized "
+                             "to the number of cores. The process backend always works on byte ranges.")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Process pool size for --backend process (default: number of cores).")
+    parser.add_argument('--top', type=int, default=None, metavar='K',
+                        help="Print only the K most frequent words.")
+    parser.add_argument('--approx', action='store_true',
+                        help="With --top, count with a fixed-size Misra-Gries summary instead of "
+                             "an exact Counter. Always works on byte ranges.")
+    parser.add_argument('--capacity', type=int, default=None,
+                        help="Counters kept per summary in --approx mode (default: max(10*K, 1000)).")
+    parser.add_argument('--cache-dir', default='.wordfreq_cache',
+                        help="Per-file count cache used when <input_file> is a directory or "
+                             "glob (default: .wordfreq_cache).")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Count every file of a corpus without reading or writing the cache.")
+    parser.add_argument('--quiet', action='store_true',
+                        help="Do not print intermediate per-segment counts.")
+    return parser.parse_args(argv)
+
+def main():
+    args = parse_args(sys.argv[1:])
+    input_file = args.input_file
+    try:
+        num_segments = int(args.num_segments)
+        if num_segments < 1:
+            raise ValueError
+    except ValueError:
+        print("Number of segments must be a positive integer.")
+        sys.exit(1)
+    if args.chunk_size < 1:
+        print("Chunk size must be a positive integer.")
+        sys.exit(1)
+
+    if args.workers is not None and args.workers < 1:
+        print("Number of workers must be a positive integer.")
+        sys.exit(1)
+    if args.top is not None and args.top < 1:
+        print("--top must be a positive integer.")
+        sys.exit(1)
+    capacity = None
+    if args.approx:
+        if args.top is None:
+            print("--approx requires --top K.")
+            sys.exit(1)
+        capacity = args.capacity or max(10 * args.top, 1000)
+        if capacity < args.top:
+            print("--capacity must be at least K.")
+            sys.exit(1)
+
+    global QUIET
+    QUIET = args.quiet
+    try:
+        final_count = count_file(input_file, num_segments, args.stream, args.chunk_size,
+                                 args.backend, args.workers, capacity,
+                                 None if args.no_cache else args.cache_dir)
+    except Exception as e:
+        print(f"Error reading file: {e}")
+        sys.exit(1)
 
-    print("Final consolidated word frequency count:")
-    for word, count in final_count.most_common():
+    if capacity:
+        print_approx_top(final_count, args.top)
+        return
+    if args.top is not None:
+        print(f"Top {args.top} words:")
+    else:
+        print("Final consolidated word frequency count:")
+    for word, count in final_count.most_common(args.top):
         print(f"{word}: {count}")
 
+def print_approx_top(summary, k):
+    print(f"Approximate top {k} words (Misra-Gries, {summary.capacity} counters, "
+          f"{summary.total} words):")
+    for word, count in summary.most_common(k):
+        print(f"{word}: {count}-{count + summary.error}")
+    bound = summary.error_bound()
+    print(f"Counts are underestimates by at most {summary.error} "
+          f"(guaranteed <= N/(capacity+1) = {bound}).")
+    print(f"Every word occurring more than {bound} times is kept in the summary.")
+
 if __name__ == "__main__":
     main()
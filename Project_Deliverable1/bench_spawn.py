@@ -0,0 +1,58 @@
+"""
+Microbenchmark: external commands launched per second.
+
+Compares the old launch path (subprocess.Popen, which searches PATH on every
+call) with fork + execvp and with the shell's hashed posix_spawn path used by
+run_command. Each iteration starts the command and waits for it to exit.
+
+    python3 bench_spawn.py            # 2000 runs of `true`
+    python3 bench_spawn.py 5000 echo  # 5000 runs of `echo`
+"""
+import os
+import subprocess
+import sys
+import time
+
+import shell
+
+def bench_popen(argv, n):
+    # Before: what run_command did for every external command.
+    for _ in range(n):
+        subprocess.Popen(argv).wait()
+
+def bench_fork_exec(argv, n):
+    for _ in range(n):
+        os.waitpid(shell.fork_stage(argv, None, None), 0)
+
+def bench_run_command(argv, n):
+    # After: hash table lookup + posix_spawn, including job bookkeeping.
+    cmdline = ' '.join(argv)
+    for _ in range(n):
+        shell.run_command(cmdline)
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    argv = sys.argv[2:] or ['true']
+    # Silence the command's own output so terminal speed is not measured.
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    saved_stdout = os.dup(1)
+    results = []
+    for name, fn in (("subprocess.Popen (before)", bench_popen),
+                     ("fork + execvp", bench_fork_exec),
+                     ("run_command: hash + posix_spawn (after)", bench_run_command)):
+        sys.stdout.flush()
+        os.dup2(devnull, 1)
+        try:
+            start = time.perf_counter()
+            fn(argv, n)
+            elapsed = time.perf_counter() - start
+        finally:
+            sys.stdout.flush()
+            os.dup2(saved_stdout, 1)
+        results.append((name, n / elapsed))
+    print(f"Launching {' '.join(argv)!r} {n} times:")
+    for name, rate in results:
+        print(f"{name:42} {rate:10.0f} commands/sec")
+
+if __name__ == "__main__":
+    main()
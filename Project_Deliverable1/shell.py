@@ -1,21 +1,219 @@
 """
 Advanced Shell Simulation - Deliverable 1: Basic Shell Implementation and Process Management
+
+Usage:
+    python3 shell.py                  interactive shell
+    python3 shell.py -c "cmd; cmd"    run commands in batch mode
+    python3 shell.py script.sh        run a script in batch mode (- reads stdin)
+    python3 shell.py -P 8 script.sh   run up to 8 '&' commands at once
 """
+import argparse
 import os
 import sys
-import shlex
-import subprocess
+import errno
+import functools
+import grp
+import pwd
+import shutil
 import signal
+import stat
+import time
+from contextlib import contextmanager
 
-JOBS = []  # List of background jobs: dicts with keys: id, pid, cmd, status
+# Job table. Jobs are dicts with keys: id, pid (last pipeline stage), pids
+# (stages still alive), cmd, status, exit_code. Children are reaped
+# asynchronously by the SIGCHLD handler, which updates the status
+# ('Running', 'Stopped' or 'Done') through the pid index.
+JOBS = {}          # job id -> job
+JOBS_BY_PID = {}   # pid -> job, for every child we are still waiting on
+REAPED = {}        # pid -> wait status of children reaped before being indexed
+FINISHED = []      # background jobs that completed since the last notification
 JOB_ID = 1
+LAST_JOB = None    # most recently started background job (like $!)
+INTERACTIVE = True # False in batch mode: no prompt and no job start messages
+BATCH_FINISHED_JOBS = 1024  # finished background jobs remembered in batch mode
+CWD = None         # cached working directory for the prompt; updated by cd
+
+# ---------------------- Job control ----------------------
+
+def record_status(pid, status):
+    job = JOBS_BY_PID.get(pid)
+    if job is None:
+        REAPED[pid] = status
+        return
+    if os.WIFSTOPPED(status):
+        job['status'] = 'Stopped'
+    elif os.WIFCONTINUED(status):
+        job['status'] = 'Running'
+    else:
+        finish_pid(job, pid, os.waitstatus_to_exitcode(status))
+
+def finish_pid(job, pid, exit_code):
+    # A pipeline is done when every stage has exited; its exit code is the last stage's.
+    JOBS_BY_PID.pop(pid, None)
+    job['pids'].discard(pid)
+    if pid == job['pid']:
+        job['exit_code'] = exit_code
+    if not job['pids']:
+        job['status'] = 'Done'
+        job['ended'] = time.monotonic()
+        if job['id'] is not None:
+            FINISHED.append(job)
+
+def reap_children(signum=None, frame=None):
+    # SIGCHLD handler: collect every child that changed state, without blocking.
+    while True:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG | os.WUNTRACED | os.WCONTINUED)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        record_status(pid, status)
+
+@contextmanager
+def sigchld_blocked():
+    # Keep the handler from reaping a child while we wait on it directly.
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGCHLD})
+    try:
+        yield
+    finally:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGCHLD})
+
+def track(pids, cmd):
+    job = {'id': None, 'pid': pids[-1], 'pids': set(pids), 'cmd': cmd,
+           'status': 'Running', 'exit_code': None,
+           'started': time.monotonic(), 'ended': None}
+    for pid in pids:
+        JOBS_BY_PID[pid] = job
+    for pid in pids:
+        if pid in REAPED:  # it finished before we indexed it
+            record_status(pid, REAPED.pop(pid))
+    return job
+
+def add_job(job):
+    global JOB_ID
+    job['id'] = JOB_ID
+    JOBS[JOB_ID] = job
+    JOB_ID += 1
+    if job['status'] == 'Done':
+        FINISHED.append(job)
+    return job
+
+def wait_for_job(job):
+    # Block until the job exits or stops; returns its status.
+    with sigchld_blocked():
+        while job['status'] == 'Running':
+            pid = next(iter(job['pids']))
+            try:
+                pid, status = os.waitpid(pid, os.WUNTRACED)
+            except ChildProcessError:
+                finish_pid(job, pid, None)
+                continue
+            record_status(pid, status)
+    return job['status']
+
+def continue_job(job):
+    for pid in job['pids']:
+        os.kill(pid, signal.SIGCONT)
+
+def format_job(job):
+    status = job['status']
+    if status == 'Done':
+        status = f"Done (exit {job['exit_code']})"
+    return f"[{job['id']}] {job['pid']} {status} {job['cmd']}"
+
+def notify_jobs():
+    # Report background jobs that finished since the last prompt, then forget them.
+    while FINISHED:
+        job = FINISHED.pop(0)
+        if JOBS.pop(job['id'], None) is not None:
+            print(format_job(job))
+
+def forget_finished(keep):
+    # Batch mode has no prompt at which to report finished jobs, so drop all
+    # but the `keep` most recent (kept so that 'wait N' still finds them).
+    with sigchld_blocked():
+        while len(FINISHED) > keep:
+            JOBS.pop(FINISHED.pop(0)['id'], None)
+
+def find_job(arg):
+    return JOBS.get(int(arg.lstrip('%')))
+
+# ---------------------- Command hash table ----------------------
+
+# Like bash's `hash`: command name -> resolved executable, so PATH is searched
+# once per command rather than on every launch. The table is dropped when PATH
+# changes or when any PATH directory's mtime changes (checked at most every
+# HASH_CHECK_INTERVAL seconds). SPAWN_ENV is a plain-dict snapshot of
+# os.environ refreshed on the same schedule, since converting os.environ on
+# every posix_spawn costs more than the spawn itself.
+HASH = {}              # command name -> absolute path
+HASH_HITS = {}         # command name -> times the cached path was used
+HASH_PATH = None       # PATH value the table was built for
+HASH_DIR_MTIMES = {}   # PATH directory -> st_mtime_ns when the table was built
+HASH_CHECK_INTERVAL = 1.0
+HASH_CHECKED_AT = 0.0
+SPAWN_ENV = {}
+
+def dir_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def reset_hash():
+    global HASH_PATH, HASH_CHECKED_AT
+    HASH.clear()
+    HASH_HITS.clear()
+    HASH_PATH = os.environ.get('PATH', os.defpath)
+    HASH_DIR_MTIMES.clear()
+    for d in HASH_PATH.split(os.pathsep):
+        HASH_DIR_MTIMES[d] = dir_mtime(d or '.')
+    HASH_CHECKED_AT = time.monotonic()
+
+def check_hash():
+    global HASH_CHECKED_AT, SPAWN_ENV
+    if os.environ.get('PATH', os.defpath) != HASH_PATH:
+        reset_hash()
+        SPAWN_ENV = dict(os.environ)
+        return
+    now = time.monotonic()
+    if now - HASH_CHECKED_AT < HASH_CHECK_INTERVAL:
+        return
+    HASH_CHECKED_AT = now
+    SPAWN_ENV = dict(os.environ)
+    if any(dir_mtime(d or '.') != mtime for d, mtime in HASH_DIR_MTIMES.items()):
+        reset_hash()
+
+def resolve_command(name):
+    # Returns the executable for `name`, or None if it is not on PATH.
+    if '/' in name:
+        return name
+    check_hash()
+    path = HASH.get(name)
+    if path is not None:
+        HASH_HITS[name] += 1
+        return path
+    path = shutil.which(name, path=HASH_PATH)
+    if path is not None:
+        HASH[name] = path
+        HASH_HITS[name] = 1
+    return path
+
+def forget_command(name):
+    HASH.pop(name, None)
+    HASH_HITS.pop(name, None)
 
 # Built-in command implementations
 def cmd_cd(args):
+    global CWD
     try:
         os.chdir(args[1] if len(args) > 1 else os.path.expanduser('~'))
+        CWD = os.getcwd()
     except Exception as e:
         print(f"cd: {e}")
+        return 1
 
 def cmd_pwd(args):
     print(os.getcwd())
@@ -30,101 +228,268 @@ def cmd_echo(args):
 def cmd_clear(args):
     os.system('clear')
 
+LS_BATCH = 4096           # entries per write in ls
+COPY_CHUNK = 1 << 20      # bytes per read/write when cat cannot use sendfile
+SENDFILE_CHUNK = 1 << 30  # bytes per sendfile call
+
+@functools.lru_cache(maxsize=None)
+def owner_name(uid):
+    try:
+        return pwd.getpwuid(uid).pw_name
+    except KeyError:
+        return str(uid)
+
+@functools.lru_cache(maxsize=None)
+def group_name(gid):
+    try:
+        return grp.getgrgid(gid).gr_name
+    except KeyError:
+        return str(gid)
+
+def format_long(name, st, path):
+    mtime = time.strftime('%b %d %H:%M', time.localtime(st.st_mtime))
+    line = (f"{stat.filemode(st.st_mode)} {st.st_nlink:3} {owner_name(st.st_uid):8} "
+            f"{group_name(st.st_gid):8} {st.st_size:10} {mtime} {name}")
+    if stat.S_ISLNK(st.st_mode):
+        line += f" -> {os.readlink(path)}"
+    return line
+
+def list_dir(path, long_format):
+    # scandir yields names (and file types) straight from readdir; output is
+    # written in batches rather than one print per entry.
+    batch = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if long_format:
+                batch.append(format_long(entry.name, entry.stat(follow_symlinks=False), entry.path))
+            else:
+                batch.append(entry.name)
+            if len(batch) >= LS_BATCH:
+                sys.stdout.write('\n'.join(batch) + '\n')
+                batch.clear()
+    if batch:
+        sys.stdout.write('\n'.join(batch) + '\n')
+
 def cmd_ls(args):
-    for f in os.listdir(os.getcwd()):
-        print(f)
+    # ls [-l] [path ...]
+    long_format = False
+    paths = []
+    for arg in args[1:]:
+        if arg.startswith('-') and len(arg) > 1:
+            for flag in arg[1:]:
+                if flag != 'l':
+                    print(f"ls: invalid option -- '{flag}'")
+                    return 2
+            long_format = True
+        else:
+            paths.append(arg)
+    status = 0
+    for i, path in enumerate(paths or ['.']):
+        try:
+            if not os.path.isdir(path):
+                st = os.lstat(path)
+                print(format_long(path, st, path) if long_format else path)
+                continue
+            if len(paths) > 1:
+                print(f"\n{path}:" if i else f"{path}:")
+            list_dir(path, long_format)
+        except Exception as e:
+            print(f"ls: {e}")
+            status = 1
+    return status
 
-def cmd_cat(args):
-    if len(args) < 2:
-        print("cat: missing filename")
-        return
+def copy_to_stdout(fd):
+    # Copy in the kernel with sendfile when both ends allow it (regular file
+    # in, any fd out); otherwise fall back to large read/write chunks.
+    offset = None
     try:
-        with open(args[1], 'r') as f:
-            print(f.read(), end='')
-    except Exception as e:
-        print(f"cat: {e}")
+        offset = os.lseek(fd, 0, os.SEEK_CUR)
+        while True:
+            sent = os.sendfile(1, fd, offset, SENDFILE_CHUNK)
+            if sent == 0:
+                return
+            offset += sent
+    except OSError as e:
+        if e.errno not in (errno.EINVAL, errno.ENOSYS, errno.ESPIPE, errno.EOPNOTSUPP):
+            raise
+    if offset is not None:
+        # sendfile with an explicit offset leaves the file position alone, so
+        # move it past what was already sent before reading the rest.
+        os.lseek(fd, offset, os.SEEK_SET)
+    while True:
+        data = os.read(fd, COPY_CHUNK)
+        if not data:
+            return
+        view = memoryview(data)
+        while view:
+            view = view[os.write(1, view):]
+
+def cmd_cat(args):
+    # cat [file ...]; with no file (or '-') reads stdin, e.g. in a pipeline.
+    names = args[1:]
+    if not names:
+        if os.isatty(0):
+            print("cat: missing filename")
+            return 2
+        names = ['-']
+    sys.stdout.flush()
+    status = 0
+    for name in names:
+        try:
+            if name == '-':
+                copy_to_stdout(0)
+                continue
+            fd = os.open(name, os.O_RDONLY)
+            try:
+                copy_to_stdout(fd)
+            finally:
+                os.close(fd)
+        except Exception as e:
+            print(f"cat: {e}")
+            status = 1
+    return status
 
 def cmd_mkdir(args):
     if len(args) < 2:
         print("mkdir: missing directory name")
-        return
+        return 2
     try:
         os.mkdir(args[1])
     except Exception as e:
         print(f"mkdir: {e}")
+        return 1
 
 def cmd_rmdir(args):
     if len(args) < 2:
         print("rmdir: missing directory name")
-        return
+        return 2
     try:
         os.rmdir(args[1])
     except Exception as e:
         print(f"rmdir: {e}")
+        return 1
 
 def cmd_rm(args):
     if len(args) < 2:
         print("rm: missing filename")
-        return
+        return 2
     try:
         os.remove(args[1])
     except Exception as e:
         print(f"rm: {e}")
+        return 1
 
 def cmd_touch(args):
     if len(args) < 2:
         print("touch: missing filename")
-        return
+        return 2
     try:
         with open(args[1], 'a'):
             os.utime(args[1], None)
     except Exception as e:
         print(f"touch: {e}")
+        return 1
 
 def cmd_kill(args):
     if len(args) < 2:
         print("kill: missing pid")
-        return
+        return 2
     try:
         os.kill(int(args[1]), signal.SIGTERM)
     except Exception as e:
         print(f"kill: {e}")
+        return 1
+
+def cmd_hash(args):
+    # hash           -- list remembered commands
+    # hash -r        -- forget all remembered commands
+    # hash NAME...   -- look up and remember NAME
+    if len(args) == 1:
+        check_hash()
+        if not HASH:
+            print("hash: hash table empty")
+            return
+        print("hits\tcommand")
+        for name, path in HASH.items():
+            print(f"{HASH_HITS[name]:4}\t{path}")
+        return
+    if args[1] == '-r':
+        reset_hash()
+        return
+    status = 0
+    for name in args[1:]:
+        if name in BUILTINS:
+            continue
+        forget_command(name)
+        if resolve_command(name) is None:
+            print(f"hash: {name}: not found")
+            status = 1
+        else:
+            HASH_HITS[name] = 0
+    return status
 
 def cmd_jobs(args):
-    for job in JOBS:
-        print(f"[{job['id']}] {job['pid']} {job['status']} {job['cmd']}")
+    for job in list(JOBS.values()):
+        print(format_job(job))
+    # Finished jobs have now been reported.
+    FINISHED.clear()
+    for job_id in [j['id'] for j in JOBS.values() if j['status'] == 'Done']:
+        del JOBS[job_id]
 
 def cmd_fg(args):
     if len(args) < 2:
         print("fg: missing job id")
-        return
+        return 2
     try:
-        job_id = int(args[1])
-        for job in JOBS:
-            if job['id'] == job_id:
-                os.waitpid(job['pid'], 0)
-                job['status'] = 'Done'
-                print(f"Brought job [{job_id}] to foreground.")
-                return
-        print(f"fg: job {job_id} not found")
+        job = find_job(args[1])
+        if job is None:
+            print(f"fg: job {args[1]} not found")
+            return 1
+        print(f"Brought job [{job['id']}] to foreground.")
+        if job['status'] == 'Stopped':
+            continue_job(job)
+            job['status'] = 'Running'
+        if wait_for_job(job) == 'Stopped':
+            print(format_job(job))
+        else:
+            JOBS.pop(job['id'], None)
     except Exception as e:
         print(f"fg: {e}")
+        return 1
 
 def cmd_bg(args):
     if len(args) < 2:
         print("bg: missing job id")
-        return
+        return 2
     try:
-        job_id = int(args[1])
-        for job in JOBS:
-            if job['id'] == job_id:
-                os.kill(job['pid'], signal.SIGCONT)
-                job['status'] = 'Running'
-                print(f"Resumed job [{job_id}] in background.")
-                return
-        print(f"bg: job {job_id} not found")
+        job = find_job(args[1])
+        if job is None:
+            print(f"bg: job {args[1]} not found")
+            return 1
+        continue_job(job)
+        if job['status'] == 'Stopped':
+            job['status'] = 'Running'
+        print(f"Resumed job [{job['id']}] in background.")
     except Exception as e:
         print(f"bg: {e}")
+        return 1
+
+def cmd_wait(args):
+    # wait           -- wait for every background job
+    # wait N [M...]  -- wait for the given job ids (%N is accepted too)
+    try:
+        jobs = [find_job(a) for a in args[1:]] if len(args) > 1 else list(JOBS.values())
+    except ValueError as e:
+        print(f"wait: {e}")
+        return 2
+    status = 0
+    for arg, job in zip(args[1:] or [None] * len(jobs), jobs):
+        if job is None:
+            print(f"wait: job {arg} not found")
+            status = 127
+            continue
+        wait_for_job(job)
+    return status
 
 BUILTINS = {
     'cd': cmd_cd,
@@ -142,40 +507,429 @@ BUILTINS = {
     'jobs': cmd_jobs,
     'fg': cmd_fg,
     'bg': cmd_bg,
+    'wait': cmd_wait,
+    'hash': cmd_hash,
 }
 
+# ---------------------- Pipelines and redirection ----------------------
+
+OPERATORS = ('>>', '&&', '||', '|', '<', '>', '&')  # longest first
+
+class Operator(str):
+    # An unquoted operator token. Quoted or escaped, the same text is an
+    # ordinary word: echo '|' prints a bar.
+    pass
+
+def tokenize(cmdline):
+    # Like shlex.split, but unquoted |, <, >, >>, &, && and || are Operator
+    # tokens even without spaces around them.
+    tokens, word = [], []
+    in_word = False  # '' is an (empty) word too
+    quote = None
+    i, n = 0, len(cmdline)
+    while i < n:
+        ch = cmdline[i]
+        if quote == "'":
+            if ch == "'":
+                quote = None
+            else:
+                word.append(ch)
+        elif quote == '"':
+            if ch == '"':
+                quote = None
+            elif ch == '\\' and i + 1 < n and cmdline[i + 1] in '"\\':
+                i += 1
+                word.append(cmdline[i])
+            else:
+                word.append(ch)
+        elif ch == '\\':
+            if i + 1 == n:
+                raise ValueError("No escaped character")
+            i += 1
+            word.append(cmdline[i])
+            in_word = True
+        elif ch in '\'"':
+            quote = ch
+            in_word = True
+        elif ch.isspace() or ch in '|&<>':
+            if in_word:
+                tokens.append(''.join(word))
+                word, in_word = [], False
+            if not ch.isspace():
+                op = next(op for op in OPERATORS if cmdline.startswith(op, i))
+                tokens.append(Operator(op))
+                i += len(op)
+                continue
+        else:
+            word.append(ch)
+            in_word = True
+        i += 1
+    if quote:
+        raise ValueError("No closing quotation")
+    if in_word:
+        tokens.append(''.join(word))
+    return tokens
+
+def is_operator(tok, *ops):
+    return isinstance(tok, Operator) and (not ops or tok in ops)
+
+def parse_pipeline(tokens):
+    # Returns one dict per stage: argv, stdin (path), stdout (path), append.
+    stages = []
+    stage = {'argv': [], 'stdin': None, 'stdout': None, 'append': False}
+    tokens = iter(tokens)
+    for tok in tokens:
+        if not is_operator(tok):
+            stage['argv'].append(tok)
+        elif tok == '|':
+            if not stage['argv']:
+                raise ValueError("syntax error near '|'")
+            stages.append(stage)
+            stage = {'argv': [], 'stdin': None, 'stdout': None, 'append': False}
+        elif tok in ('<', '>', '>>'):
+            target = next(tokens, None)
+            if target is None or is_operator(target):
+                raise ValueError(f"syntax error near '{tok}'")
+            if tok == '<':
+                stage['stdin'] = target
+            else:
+                stage['stdout'] = target
+                stage['append'] = tok == '>>'
+        elif tok == '&':
+            raise ValueError("syntax error near '&'")
+        else:
+            raise ValueError(f"syntax error near '{tok}' ('&&' and '||' are not supported)")
+    if not stage['argv']:
+        raise ValueError("missing command")
+    stages.append(stage)
+    return stages
+
+def open_redirects(stage):
+    # Opened in the shell so a bad path is reported before anything is started.
+    stdin_fd = stdout_fd = None
+    try:
+        if stage['stdin'] is not None:
+            stdin_fd = os.open(stage['stdin'], os.O_RDONLY)
+        if stage['stdout'] is not None:
+            flags = os.O_WRONLY | os.O_CREAT | (os.O_APPEND if stage['append'] else os.O_TRUNC)
+            stdout_fd = os.open(stage['stdout'], flags, 0o666)
+    except OSError:
+        if stdin_fd is not None:
+            os.close(stdin_fd)
+        raise
+    return stdin_fd, stdout_fd
+
+def spawn_stage(argv, stdin_fd, stdout_fd, close_fds=()):
+    # External commands are started with posix_spawn (vfork-style, no copy of
+    # the interpreter) using the hashed path. Builtins, and commands that
+    # cannot be resolved, fall back to fork_stage. `close_fds` are the
+    # pipeline's other fds, which a forked builtin must not keep open.
+    if argv[0] not in BUILTINS and hasattr(os, 'posix_spawn'):
+        path = resolve_command(argv[0])
+        if path is not None:
+            file_actions = []
+            if stdin_fd is not None:
+                file_actions.append((os.POSIX_SPAWN_DUP2, stdin_fd, 0))
+            if stdout_fd is not None:
+                file_actions.append((os.POSIX_SPAWN_DUP2, stdout_fd, 1))
+            try:
+                # Python ignores SIGPIPE and SIGXFSZ; give the child the defaults back.
+                return os.posix_spawn(path, argv, SPAWN_ENV, file_actions=file_actions,
+                                      setsigdef=(signal.SIGPIPE, signal.SIGXFSZ))
+            except FileNotFoundError:
+                forget_command(argv[0])  # stale entry: the file went away
+    return fork_stage(argv, stdin_fd, stdout_fd, close_fds)
+
+def fork_stage(argv, stdin_fd, stdout_fd, close_fds=()):
+    # Fork one pipeline stage with its stdin/stdout wired to the given fds.
+    # The pipe fds are non-inheritable, so exec closes every copy but 0 and 1.
+    # A builtin never execs, so the child closes them itself: otherwise a
+    # builtin writing into a pipe would also hold that pipe's read end open
+    # and never see EPIPE when the reader exits.
+    sys.stdout.flush()
+    pid = os.fork()
+    if pid:
+        return pid
+    code = 1
+    try:
+        for sig in (signal.SIGCHLD, signal.SIGINT, signal.SIGPIPE, signal.SIGXFSZ):
+            signal.signal(sig, signal.SIG_DFL)
+        if stdin_fd is not None:
+            os.dup2(stdin_fd, 0)
+        if stdout_fd is not None:
+            os.dup2(stdout_fd, 1)
+        for fd in {stdin_fd, stdout_fd, *close_fds} - {None, 0, 1, 2}:
+            os.close(fd)
+        if argv[0] in BUILTINS:
+            code = BUILTINS[argv[0]](argv) or 0
+            sys.stdout.flush()
+        else:
+            try:
+                os.execvp(argv[0], argv)
+            except FileNotFoundError:
+                print(f"{argv[0]}: command not found", file=sys.stderr)
+                code = 127
+            except OSError as e:
+                print(f"{argv[0]}: {e.strerror}", file=sys.stderr)
+                code = 126
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 0
+    except BaseException as e:
+        print(f"{argv[0]}: {e}", file=sys.stderr)
+    finally:
+        os._exit(code)
+
+def run_builtin(stage):
+    # Builtins alone on a line run in the shell itself (so cd works), with
+    # any redirection applied to fds 0/1 for the duration of the call.
+    stdin_fd, stdout_fd = open_redirects(stage)
+    sys.stdout.flush()
+    saved = []
+    try:
+        for fd, new_fd in ((0, stdin_fd), (1, stdout_fd)):
+            if new_fd is not None:
+                saved.append((fd, os.dup(fd)))
+                os.dup2(new_fd, fd)
+        return BUILTINS[stage['argv'][0]](stage['argv'])
+    finally:
+        sys.stdout.flush()
+        for fd, copy in saved:
+            os.dup2(copy, fd)
+            os.close(copy)
+        for fd in (stdin_fd, stdout_fd):
+            if fd is not None:
+                os.close(fd)
+
+def run_pipeline(stages, cmdline, background):
+    # Start every stage at once, connected by kernel pipes; the shell never
+    # touches the data flowing between them.
+    redirects = []
+    try:
+        for stage in stages:
+            redirects.append(open_redirects(stage))
+    except OSError:
+        for fds in redirects:
+            for fd in fds:
+                if fd is not None:
+                    os.close(fd)
+        raise
+    pids = []
+    prev_read = read_end = write_end = None
+    try:
+        for i, stage in enumerate(stages):
+            read_end = write_end = None
+            if i < len(stages) - 1:
+                read_end, write_end = os.pipe()
+            stdin_fd, stdout_fd = redirects[i]
+            # Every fd of the pipeline still open in the shell at this point.
+            open_fds = [read_end, prev_read, write_end]
+            open_fds += [fd for fds in redirects[i:] for fd in fds]
+            pids.append(spawn_stage(stage['argv'],
+                                    stdin_fd if stdin_fd is not None else prev_read,
+                                    stdout_fd if stdout_fd is not None else write_end,
+                                    open_fds))
+            redirects[i] = (None, None)
+            for fd in (prev_read, write_end, stdin_fd, stdout_fd):
+                if fd is not None:
+                    os.close(fd)
+            prev_read, read_end, write_end = read_end, None, None
+    except BaseException:
+        # Whatever failed, close every fd still open here. The stages that did
+        # start see EOF or EPIPE; track them so the SIGCHLD handler reaps them.
+        for fd in (prev_read, read_end, write_end, *(fd for fds in redirects for fd in fds)):
+            if fd is not None:
+                os.close(fd)
+        if pids:
+            track(pids, cmdline)
+        raise
+    if prev_read is not None:
+        os.close(prev_read)
+    job = track(pids, cmdline)
+    if background:
+        global LAST_JOB
+        LAST_JOB = add_job(job)
+        if INTERACTIVE:
+            print(f"Started job [{job['id']}] {job['pid']} in background.")
+        return 0
+    if wait_for_job(job) == 'Stopped':
+        add_job(job)
+        print(format_job(job))
+        return 128 + signal.SIGTSTP
+    return job['exit_code']
+
 def run_command(cmdline):
-    global JOB_ID
+    # Returns the exit status (0 for a command started in the background).
     if not cmdline.strip():
-        return
-    args = shlex.split(cmdline)
-    if not args:
-        return
+        return 0
+    try:
+        tokens = tokenize(cmdline)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    if not tokens:
+        return 0
     background = False
-    if args[-1] == '&':
+    if is_operator(tokens[-1], '&'):
         background = True
-        args = args[:-1]
-    if args[0] in BUILTINS:
-        BUILTINS[args[0]](args)
-        return
+        tokens = tokens[:-1]
     try:
-        proc = subprocess.Popen(args)
-        if background:
-            JOBS.append({'id': JOB_ID, 'pid': proc.pid, 'cmd': cmdline, 'status': 'Running'})
-            print(f"Started job [{JOB_ID}] {proc.pid} in background.")
-            JOB_ID += 1
-        else:
-            proc.wait()
-    except FileNotFoundError:
-        print(f"{args[0]}: command not found")
+        stages = parse_pipeline(tokens)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    try:
+        if len(stages) == 1 and stages[0]['argv'][0] in BUILTINS and not background:
+            return run_builtin(stages[0]) or 0
+        return run_pipeline(stages, cmdline, background)
+    except OSError as e:
+        print(f"{e.filename}: {e.strerror}" if e.filename else f"Error: {e}")
     except Exception as e:
         print(f"Error: {e}")
+    return 1
+
+# ---------------------- Batch mode ----------------------
+
+def split_commands(text):
+    # Split a script into commands on newlines, ';' and '&' outside quotes.
+    # Blank lines and '#' comment lines are skipped.
+    commands, current = [], []
+    quote = None
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == '\\' and quote == '"' and i + 1 < len(text):
+                current.append(text[i:i + 2])
+                i += 2
+                continue
+            if ch == quote:
+                quote = None
+            current.append(ch)
+        elif ch == '\\' and i + 1 < len(text):
+            current.append(text[i:i + 2])
+            i += 2
+            continue
+        elif ch in '\'"':
+            quote = ch
+            current.append(ch)
+        elif ch in ';\n&':
+            if ch == '&':  # 'a & b' runs a in the background, then b
+                if text.startswith('&&', i):
+                    raise ValueError("syntax error near '&&' ('&&' and '||' are not supported)")
+                current.append(ch)
+            commands.append(''.join(current))
+            current = []
+        elif ch == '#' and not ''.join(current).strip():
+            end = text.find('\n', i)
+            i = len(text) if end == -1 else end
+            continue
+        else:
+            current.append(ch)
+        i += 1
+    commands.append(''.join(current))
+    return [c.strip() for c in commands if c.strip()]
+
+def wait_for_slot(active, limit):
+    # Block until fewer than `limit` of the batch's background jobs are running.
+    with sigchld_blocked():
+        while True:
+            active[:] = [job for job in active if job['status'] == 'Running']
+            if len(active) < limit:
+                return
+            try:
+                pid, status = os.waitpid(-1, os.WUNTRACED)
+            except ChildProcessError:
+                return
+            record_status(pid, status)
+
+def run_batch(text, parallelism):
+    # Run every command without a prompt. Foreground commands run in order;
+    # '&' commands run concurrently, at most `parallelism` at a time.
+    global INTERACTIVE
+    INTERACTIVE = False
+    start = time.monotonic()
+    try:
+        commands = split_commands(text)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    results = []   # (command, exit status, seconds), or the job of a '&' command
+    active = []
+    for cmdline in commands:
+        background = cmdline.endswith('&')
+        if background:
+            wait_for_slot(active, parallelism)
+        job_before = LAST_JOB
+        t0 = time.monotonic()
+        try:
+            status = run_command(cmdline)
+        except SystemExit as e:
+            # 'exit' ends the script: stop dispatching, but still wait for
+            # the '&' commands already running and print the summary.
+            status = e.code if isinstance(e.code, int) else 0
+            results.append((cmdline, status, time.monotonic() - t0))
+            break
+        if background and LAST_JOB is not job_before:
+            active.append(LAST_JOB)
+            results.append(LAST_JOB)
+        else:
+            results.append((cmdline, status, time.monotonic() - t0))
+        forget_finished(BATCH_FINISHED_JOBS)
+    for job in active:
+        wait_for_job(job)
+    wall = time.monotonic() - start
+
+    failed = 0
+    print("\n--- batch summary ---", file=sys.stderr)
+    for i, result in enumerate(results, 1):
+        if isinstance(result, dict):
+            ended = result['ended'] or time.monotonic()
+            result = (result['cmd'], result['exit_code'], ended - result['started'])
+        cmdline, status, seconds = result
+        if status != 0:
+            failed += 1
+        print(f"[{i}] exit {status} {seconds:.3f}s {cmdline}", file=sys.stderr)
+    print(f"{len(results)} command(s), {failed} failed, wall time {wall:.3f}s", file=sys.stderr)
+    return 1 if failed else 0
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Advanced Shell Simulation")
+    parser.add_argument('-c', dest='commands', metavar='COMMANDS',
+                        help="Run COMMANDS (separated by ';' or newlines) in batch mode.")
+    parser.add_argument('-P', dest='parallelism', type=int, default=os.cpu_count() or 1,
+                        help="Maximum '&' commands running at once in batch mode "
+                             "(default: number of CPUs).")
+    parser.add_argument('script', nargs='?',
+                        help="Script to run in batch mode; '-' reads commands from stdin.")
+    return parser.parse_args(argv)
 
 def main():
+    global CWD
+    args = parse_args(sys.argv[1:])
+    signal.signal(signal.SIGCHLD, reap_children)
+    if args.parallelism < 1:
+        print("-P must be a positive integer.")
+        sys.exit(2)
+    if args.commands is not None or args.script is not None:
+        if args.commands is not None:
+            text = args.commands
+        elif args.script == '-':
+            text = sys.stdin.read()
+        else:
+            try:
+                with open(args.script, 'r') as f:
+                    text = f.read()
+            except OSError as e:
+                print(f"{args.script}: {e.strerror}")
+                sys.exit(127)
+        sys.exit(run_batch(text, args.parallelism))
+
     print("Welcome to Advanced Shell Simulation! Type 'exit' to quit.")
+    CWD = os.getcwd()
     while True:
         try:
-            cmdline = input(f"{os.getcwd()}$ ")
+            notify_jobs()
+            cmdline = input(f"{CWD}$ ")
             run_command(cmdline)
         except EOFError:
             print()
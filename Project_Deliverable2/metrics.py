@@ -0,0 +1,155 @@
+# Per-process metrics for scheduler runs
+#
+# RunMetrics stores one row per completed process in compact array-backed
+# columns (8 bytes per value instead of a Python object per field), so runs
+# with millions of processes can be summarized and exported cheaply. The
+# schedulers keep no Process objects once a row is recorded.
+# Statistics are computed over whole columns: with NumPy installed the arrays
+# are viewed as ndarrays without copying; otherwise the same numbers are
+# computed in pure Python.
+
+import csv
+import json
+import math
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional
+    np = None
+
+# Column name -> array typecode.
+COLUMNS = {
+    'pid': 'q',
+    'arrival': 'd',
+    'start': 'd',
+    'completion': 'd',
+    'burst': 'd',
+    'waiting': 'd',
+    'turnaround': 'd',
+    'response': 'd',
+    'switches': 'q',  # times the process was put on a CPU
+}
+PERCENTILES = (50, 95, 99)
+TIMING_COLUMNS = ('waiting', 'turnaround', 'response')
+
+def percentile(sorted_values, q):
+    # Linear interpolation between closest ranks (NumPy's default method).
+    if not sorted_values:
+        return math.nan
+    pos = (len(sorted_values) - 1) * q / 100
+    low = math.floor(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+class RunMetrics:
+    def __init__(self):
+        self.columns = {name: array(code) for name, code in COLUMNS.items()}
+
+    def __len__(self):
+        return len(self.columns['pid'])
+
+    def record(self, process):
+        c = self.columns
+        turnaround = process.completion_time - process.arrival_time
+        c['pid'].append(process.pid)
+        c['arrival'].append(process.arrival_time)
+        c['start'].append(process.start_time)
+        c['completion'].append(process.completion_time)
+        c['burst'].append(process.burst_time)
+        c['waiting'].append(process.waiting_time)
+        c['turnaround'].append(turnaround)
+        c['response'].append(process.response_time)
+        c['switches'].append(process.dispatches)
+
+    def rows(self, *names):
+        # Per-process tuples of the named columns, in completion order. Whole
+        # numbers come back as ints, as the scheduler's times usually are.
+        columns = [self.columns[name] for name in names]
+        for row in zip(*columns):
+            yield tuple(int(v) if v == int(v) else v for v in row)
+
+    def column(self, name):
+        # A zero-copy ndarray view when NumPy is available, else the array itself.
+        values = self.columns[name]
+        if np is not None:
+            return np.frombuffer(values, dtype=np.int64 if COLUMNS[name] == 'q' else np.float64)
+        return values
+
+    def summary(self, num_cpus=1):
+        # Aggregates over all completed processes. Utilization is total burst
+        # time over the CPU time available between the first arrival and the
+        # last completion. Fairness is Jain's index over each process's
+        # service ratio burst / turnaround (1.0 = every process slowed down
+        # equally, 1/n = one process got all the benefit).
+        n = len(self)
+        stats = {'processes': n}
+        if not n:
+            return stats
+        if np is not None:
+            arrival, completion, burst, turnaround, switches = (
+                self.column(name) for name in ('arrival', 'completion', 'burst', 'turnaround', 'switches'))
+            makespan = float(completion.max() - arrival.min())
+            total_burst = float(burst.sum())
+            ratio = burst / np.maximum(turnaround, 1e-12)
+            fairness = float(ratio.sum() ** 2 / (n * (ratio * ratio).sum()))
+            context_switches = int(switches.sum())
+            for name in TIMING_COLUMNS:
+                values = self.column(name)
+                stats[f'{name}_mean'] = float(values.mean())
+                for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                    stats[f'{name}_p{q}'] = float(value)
+        else:
+            c = self.columns
+            makespan = max(c['completion']) - min(c['arrival'])
+            total_burst = math.fsum(c['burst'])
+            ratio = [b / max(t, 1e-12) for b, t in zip(c['burst'], c['turnaround'])]
+            fairness = math.fsum(ratio) ** 2 / (n * math.fsum(r * r for r in ratio))
+            context_switches = sum(c['switches'])
+            for name in TIMING_COLUMNS:
+                values = sorted(c[name])
+                stats[f'{name}_mean'] = math.fsum(values) / n
+                for q in PERCENTILES:
+                    stats[f'{name}_p{q}'] = percentile(values, q)
+        stats['makespan'] = makespan
+        stats['throughput'] = n / makespan if makespan else 0.0
+        stats['cpu_utilization'] = total_burst / (makespan * num_cpus) if makespan else 0.0
+        stats['fairness'] = fairness
+        stats['context_switches'] = context_switches
+        return stats
+
+    def print_summary(self, num_cpus=1):
+        stats = self.summary(num_cpus)
+        if not stats['processes']:
+            return
+        print(f"Processes: {stats['processes']}  Makespan: {stats['makespan']:.10g}  "
+              f"Throughput: {stats['throughput']:.4f} processes/unit")
+        print(f"CPU utilization: {stats['cpu_utilization']:.1%}  Fairness (Jain): {stats['fairness']:.3f}  "
+              f"Context switches: {stats['context_switches']}")
+        print("Metric     |    Mean |     p50 |     p95 |     p99")
+        for name in TIMING_COLUMNS:
+            print(f"{name.capitalize():10} | {stats[f'{name}_mean']:7.2f} | {stats[f'{name}_p50']:7.2f} | "
+                  f"{stats[f'{name}_p95']:7.2f} | {stats[f'{name}_p99']:7.2f}")
+
+    def to_csv(self, path):
+        # One row per process, streamed from the columns.
+        columns = [self.columns[name] for name in COLUMNS]
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            writer.writerows(zip(*columns))
+
+    def to_json(self, path, num_cpus=1):
+        data = {
+            'summary': self.summary(num_cpus),
+            'columns': {name: values.tolist() for name, values in self.columns.items()},
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f)
+
+    def export(self, path, num_cpus=1):
+        # Format is chosen by extension: .json, anything else is CSV.
+        if path.endswith('.json'):
+            self.to_json(path, num_cpus)
+        else:
+            self.to_csv(path)
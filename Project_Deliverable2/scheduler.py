@@ -1,104 +1,621 @@
-
 # Process Scheduling Module
 # This file will contain the main scheduling logic and classes for Round-Robin and Priority-Based scheduling.
+#
+# Both schedulers run on a discrete-event simulation core: time is a virtual
+# clock that jumps from event to event (arrivals, quantum expiries and
+# completions, kept in a heap), so no wall time is spent between events.
+# `pacing` optionally sleeps pacing * elapsed virtual time to replay a run at
+# human speed, and `quiet` turns off all printing for large simulations.
+#
+# Processes may be given explicit arrival times; the CPU idles until the next
+# arrival when nothing is ready. PriorityScheduler can also run preemptively,
+# with aging so that long-waiting processes eventually win the CPU.
+# FairScheduler (CFS-style weighted virtual runtime) and MLFQScheduler
+# (multi-level feedback queue) plug into the same engine.
+#
+# Completed processes are recorded in self.metrics (see metrics.py) for
+# percentile summaries and CSV/JSON export; the Process objects themselves are
+# not kept, so memory does not grow with the number of completed processes.
 
 import heapq
+import itertools
+import math
 import time
 from collections import deque
 
+from metrics import RunMetrics
+
+# Event kinds. At equal times arrivals are handled before a running slice ends,
+# so a process arriving as a quantum expires is queued ahead of the preempted one.
+# WAKEUP events carry the scheduler instead of a process; they only make it
+# re-check whether the running process should be preempted.
+ARRIVAL = 0
+SLICE_END = 1
+WAKEUP = 2
+
+# print_metrics lists every process only for runs up to this size.
+PRINT_LIMIT = 1000
+
 class Process:
-    def __init__(self, pid, burst_time, priority=0):
+    def __init__(self, pid, burst_time, priority=0, arrival_time=None):
         self.pid = pid
         self.burst_time = burst_time
         self.remaining_time = burst_time
         self.priority = priority
-        self.arrival_time = 0  # For FCFS tie-breaker
+        self.arrival_time = arrival_time  # None = when added to the scheduler
+        self.affinity = None  # set of CPU ids allowed to run it (SMP), None = any
+        self.cpu = None       # CPU it last ran on (SMP)
+        self.vruntime = 0     # weighted CPU time received (FairScheduler)
+        self.level = 0        # current queue level (MLFQScheduler)
+        self.quantum_used = 0 # time used at that level (MLFQScheduler)
         self.start_time = None
         self.completion_time = None
         self.waiting_time = 0
         self.response_time = None
+        self.dispatches = 0   # context switches onto a CPU
 
     def __repr__(self):
         return f"Process(pid={self.pid}, burst={self.burst_time}, priority={self.priority})"
 
 class Scheduler:
+    # Event loop shared by all policies. Subclasses supply the ready queue
+    # (_enqueue, _pick, _ready_count) and the length of each CPU slice.
+    name = "Scheduler"
+    num_cpus = 1
+
+    def __init__(self, quiet=False, pacing=0.0):
+        self.quiet = quiet
+        self.pacing = pacing  # real seconds slept per unit of virtual time
+        self.current_time = 0
+        self.metrics = RunMetrics()
+        self.events = []      # heap of (time, kind, seq, process)
+        self.counter = itertools.count()  # event seq numbers (shared between SMP CPUs)
+        self.running = None   # process on the CPU
+        self.slice_length = 0
+        self.slice_start = 0
+        self.slice_seq = None # seq of the running slice's SLICE_END event
+        self.label = ""       # message prefix, e.g. "CPU 2: " under SMP
+
     def add_process(self, process):
+        if process.arrival_time is None:
+            process.arrival_time = self.current_time
+        self._schedule(process.arrival_time, ARRIVAL, process)
+
+    def _enqueue(self, process):
         raise NotImplementedError
-    def run(self):
+
+    def _pick(self):
         raise NotImplementedError
 
+    def _ready_count(self):
+        raise NotImplementedError
+
+    def _time_slice(self, process):
+        raise NotImplementedError
+
+    def _should_preempt(self, process):
+        # Called at each event instant while `process` is running and others are ready.
+        return False
+
+    def _steal(self, allowed):
+        # Remove and return a ready process for which allowed(process) is true,
+        # or None. Used by SMP load balancing and work stealing.
+        raise NotImplementedError
+
+    def _start_message(self):
+        return f"Starting {self.name} Scheduling"
+
+    def _dispatch_message(self, process, run_time):
+        return f"Running {process} for {run_time} unit(s)"
+
+    def _log(self, message):
+        if not self.quiet:
+            print(message)
+
+    def _schedule(self, when, kind, process):
+        seq = next(self.counter)
+        heapq.heappush(self.events, (when, kind, seq, process))
+        return seq
+
+    def _advance(self, when):
+        if self.pacing and when > self.current_time:
+            time.sleep((when - self.current_time) * self.pacing)
+        self.current_time = when
+
+    def _dispatch(self):
+        process = self._pick()
+        if process.start_time is None:
+            process.start_time = self.current_time
+            process.response_time = self.current_time - process.arrival_time
+        process.dispatches += 1
+        run_time = self._time_slice(process)
+        if not self.quiet:
+            print(self.label + self._dispatch_message(process, run_time))
+        self.running = process
+        self.slice_length = run_time
+        self.slice_start = self.current_time
+        seq = self.slice_seq = next(self.counter)
+        heapq.heappush(self.events, (self.current_time + run_time, SLICE_END, seq, process))
+
+    def _end_slice(self, process):
+        self.running = None
+        self.slice_seq = None
+        process.remaining_time -= self.slice_length
+        if process.remaining_time > 0:
+            self._enqueue(process)
+        else:
+            self._complete(process)
+
+    def _preempt(self):
+        # Stop the running slice early; its SLICE_END event becomes stale.
+        process = self.running
+        process.remaining_time -= self.current_time - self.slice_start
+        self.running = None
+        self.slice_seq = None
+        if not self.quiet:
+            print(f"{self.label}Process {process.pid} preempted at time {self.current_time}")
+        self._enqueue(process)
+        self._dispatch()
+
+    def _complete(self, process):
+        process.completion_time = self.current_time
+        process.waiting_time = (process.completion_time - process.arrival_time - process.burst_time)
+        if not self.quiet:
+            print(f"{self.label}Process {process.pid} completed at time {self.current_time}")
+        self.metrics.record(process)
+
+    def _stale(self, event):
+        # The SLICE_END of a slice that was cancelled (preempted).
+        return event[1] == SLICE_END and event[2] != self.slice_seq
+
+    def _more_now(self, when):
+        # Whether another live event is due at `when`. Cancelled slices are
+        # dropped off the top first, or they would hold back the dispatch.
+        events = self.events
+        while events and self._stale(events[0]):
+            heapq.heappop(events)
+        return bool(events) and events[0][0] <= when
+
+    def run(self):
+        self._log(self._start_message())
+        events = self.events
+        while events:
+            event = heapq.heappop(events)
+            if self._stale(event):
+                continue
+            when, kind, seq, process = event
+            if self.pacing:
+                self._advance(when)
+            else:
+                self.current_time = when
+            if kind == ARRIVAL:
+                self._enqueue(process)
+            elif kind == SLICE_END:
+                self._end_slice(process)
+            # Handle every event at this instant before picking what runs next.
+            if self._more_now(when) or not self._ready_count():
+                continue
+            if self.running is None:
+                self._dispatch()
+            elif self._should_preempt(self.running):
+                self._preempt()
+        if not self.quiet:
+            self.print_metrics()
+        return self.metrics
+
+    def print_metrics(self):
+        print(f"\nPerformance Metrics ({self.name}):")
+        if len(self.metrics) <= PRINT_LIMIT:
+            print("PID | Waiting | Turnaround | Response")
+            for pid, waiting, turnaround, response in self.metrics.rows('pid', 'waiting', 'turnaround', 'response'):
+                print(f"{pid:3} | {waiting:7} | {turnaround:10} | {response:8}")
+        else:
+            print(f"({len(self.metrics)} processes; per-process table omitted, use metrics.export())")
+        print()
+        self.metrics.print_summary(self.num_cpus)
+
+    def export_metrics(self, path):
+        # Write per-process metrics to `path` (.json, otherwise CSV).
+        self.metrics.export(path, self.num_cpus)
+
 class RoundRobinScheduler(Scheduler):
-    def __init__(self, time_slice=1):
+    name = "Round-Robin"
+
+    def __init__(self, time_slice=1, quiet=False, pacing=0.0):
+        super().__init__(quiet, pacing)
         self.time_slice = time_slice
         self.queue = deque()
-        self.current_time = 0
-        self.finished = []
 
-    def add_process(self, process):
-        process.arrival_time = self.current_time
+    def _start_message(self):
+        return f"Starting Round-Robin Scheduling with time slice = {self.time_slice}"
+
+    def _enqueue(self, process):
         self.queue.append(process)
 
-    def run(self):
-        print(f"Starting Round-Robin Scheduling with time slice = {self.time_slice}")
-        while self.queue:
-            process = self.queue.popleft()
-            if process.start_time is None:
-                process.start_time = self.current_time
-                process.response_time = self.current_time - process.arrival_time
-            run_time = min(self.time_slice, process.remaining_time)
-            print(f"Running {process} for {run_time} unit(s)")
-            time.sleep(run_time * 0.1)  # Simulate execution (scaled down)
-            process.remaining_time -= run_time
-            self.current_time += run_time
-            if process.remaining_time > 0:
-                self.queue.append(process)
-            else:
-                process.completion_time = self.current_time
-                process.waiting_time = (process.completion_time - process.arrival_time - process.burst_time)
-                print(f"Process {process.pid} completed at time {self.current_time}")
-                self.finished.append(process)
-        self.print_metrics()
+    def _pick(self):
+        return self.queue.popleft()
 
-    def print_metrics(self):
-        print("\nPerformance Metrics (Round-Robin):")
-        print("PID | Waiting | Turnaround | Response")
-        for p in self.finished:
-            turnaround = p.completion_time - p.arrival_time
-            print(f"{p.pid:3} | {p.waiting_time:7} | {turnaround:10} | {p.response_time:8}")
+    def _ready_count(self):
+        return len(self.queue)
+
+    def _steal(self, allowed, scan=32):
+        # Take from the tail: the process that would wait longest here.
+        queue = self.queue
+        for i in range(len(queue) - 1, max(len(queue) - scan, 0) - 1, -1):
+            if allowed(queue[i]):
+                process = queue[i]
+                del queue[i]
+                return process
+        return None
+
+    def _time_slice(self, process):
+        return min(self.time_slice, process.remaining_time)
+
+REMOVED = object()  # placeholder for a lazily deleted heap entry
+
+def steal_entry(heap, allowed, scan):
+    # Return a live entry among the last `scan` live entries of the heap (its
+    # leaves) whose process allowed() accepts, or None. REMOVED entries do not
+    # count towards `scan`: those at the end are dropped, which keeps the heap
+    # valid, and the rest are skipped.
+    while heap and heap[-1][2] is REMOVED:
+        heap.pop()
+    for i in range(len(heap) - 1, -1, -1):
+        entry = heap[i]
+        if entry[2] is REMOVED:
+            continue
+        if allowed(entry[2]):
+            return entry
+        scan -= 1
+        if not scan:
+            break
+    return None
 
 class PriorityScheduler(Scheduler):
-    def __init__(self):
-        self.heap = []  # (priority, arrival_time, process)
-        self.current_time = 0
+    # Lower value = higher priority. With preemptive=True an arriving process
+    # (or one that has aged) takes the CPU from a lower-priority running one.
+    #
+    # Aging: a waiting process gains `aging_rate` priority levels per unit of
+    # time spent in the ready queue, i.e. its effective priority at time t is
+    #     priority - aging_rate * (t - ready_since).
+    # Every waiting process ages at the same rate, so their relative order
+    # never changes while they wait, and the heap key
+    #     priority + aging_rate * ready_since
+    # stays valid without touching the heap. Removals (set_priority) use lazy
+    # deletion: the old entry is marked REMOVED and skipped when popped, so
+    # every operation stays O(log n).
+    name = "Priority-Based"
+
+    def __init__(self, preemptive=False, aging_rate=0.0, quiet=False, pacing=0.0):
+        super().__init__(quiet, pacing)
+        self.preemptive = preemptive
+        self.aging_rate = aging_rate
+        self.heap = []  # [key, arrival counter, process]
+        self.entry_finder = {}  # pid -> heap entry of each ready process
         self.arrival_counter = 0
-        self.finished = []
+        self.running_priority = None  # effective priority the running process was picked with
+        self.wakeups = set()  # times of the pending aging WAKEUP events
 
-    def add_process(self, process):
-        # Lower value = higher priority
-        process.arrival_time = self.current_time
-        heapq.heappush(self.heap, (process.priority, self.arrival_counter, process))
+    def _start_message(self):
+        options = []
+        if self.preemptive:
+            options.append("preemptive")
+        if self.aging_rate:
+            options.append(f"aging rate {self.aging_rate}")
+        suffix = f" ({', '.join(options)})" if options else ""
+        return f"Starting Priority-Based Scheduling{suffix}"
+
+    def _key(self, priority, ready_since):
+        return priority + self.aging_rate * ready_since if self.aging_rate else priority
+
+    def _push(self, process, ready_since):
+        entry = [self._key(process.priority, ready_since), self.arrival_counter, process, ready_since]
         self.arrival_counter += 1
+        self.entry_finder[process.pid] = entry
+        heapq.heappush(self.heap, entry)
 
-    def run(self):
-        print("Starting Priority-Based Scheduling")
-        while self.heap:
-            priority, arrival, process = heapq.heappop(self.heap)
-            if process.start_time is None:
-                process.start_time = self.current_time
-                process.response_time = self.current_time - process.arrival_time
-            print(f"Running {process} (priority={priority}) for {process.remaining_time} unit(s)")
-            time.sleep(process.remaining_time * 0.1)  # Simulate execution (scaled down)
-            self.current_time += process.remaining_time
-            process.completion_time = self.current_time
-            process.waiting_time = (process.completion_time - process.arrival_time - process.burst_time)
-            process.remaining_time = 0
-            print(f"Process {process.pid} completed at time {self.current_time}")
-            self.finished.append(process)
-        self.print_metrics()
+    def _enqueue(self, process):
+        self._push(process, self.current_time)
 
-    def print_metrics(self):
-        print("\nPerformance Metrics (Priority-Based):")
-        print("PID | Waiting | Turnaround | Response")
-        for p in self.finished:
-            turnaround = p.completion_time - p.arrival_time
-            print(f"{p.pid:3} | {p.waiting_time:7} | {turnaround:10} | {p.response_time:8}")
+    def _pick(self):
+        heap = self.heap
+        while True:
+            entry = heapq.heappop(heap)
+            if entry[2] is not REMOVED:
+                del self.entry_finder[entry[2].pid]
+                # Keep the aged priority while running, so the process is not
+                # immediately preempted by the ones it just overtook.
+                self.running_priority = self.effective_priority(entry[2], entry[3])
+                return entry[2]
+
+    def _peek(self):
+        heap = self.heap
+        while heap[0][2] is REMOVED:
+            heapq.heappop(heap)
+        return heap[0]
+
+    def _ready_count(self):
+        return len(self.entry_finder)
+
+    def _steal(self, allowed, scan=32):
+        # Heap leaves hold the lowest-priority entries; steal one of those.
+        entry = steal_entry(self.heap, allowed, scan)
+        if entry is None:
+            return None
+        process = entry[2]
+        entry[2] = REMOVED
+        del self.entry_finder[process.pid]
+        return process
+
+    def set_priority(self, process, priority):
+        # Change a process's base priority (decrease- or increase-key).
+        entry = self.entry_finder.pop(process.pid, None)
+        process.priority = priority
+        if entry is None:
+            return  # running or not yet arrived: takes effect when it is queued
+        entry[2] = REMOVED
+        self._push(process, entry[3])
+        if len(self.heap) > 2 * len(self.entry_finder) + 64:
+            # Too many dead entries: rebuild so the heap stays O(ready processes).
+            self.heap = [e for e in self.heap if e[2] is not REMOVED]
+            heapq.heapify(self.heap)
+
+    def effective_priority(self, process, ready_since):
+        return process.priority - self.aging_rate * (self.current_time - ready_since)
+
+    def _time_slice(self, process):
+        # Runs to completion unless preempted.
+        return process.remaining_time
+
+    def _dispatch(self):
+        super()._dispatch()
+        if self.preemptive and self.aging_rate and self.entry_finder:
+            self._schedule_aging_wakeup()
+
+    def _should_preempt(self, process):
+        if not self.preemptive:
+            return False
+        key, _, best, ready_since = self._peek()
+        if self.effective_priority(best, ready_since) < self.running_priority:
+            return True
+        if self.aging_rate:
+            self._schedule_aging_wakeup()
+        return False
+
+    def _schedule_aging_wakeup(self):
+        # First whole time unit at which the best waiting process will have
+        # aged past the running one.
+        key = self._peek()[0]
+        crossing = (key - self.running_priority) / self.aging_rate
+        # Always strictly in the future, even when rounding puts the crossing at "now".
+        when = max(math.floor(crossing), math.floor(self.current_time)) + 1
+        if when < self.slice_start + self.slice_length:
+            wakeups = self.wakeups
+            if when in wakeups:
+                return  # one WAKEUP per instant is enough
+            if wakeups:
+                wakeups.difference_update([t for t in wakeups if t <= self.current_time])
+            wakeups.add(when)
+            self._schedule(when, WAKEUP, self)
+
+    def _dispatch_message(self, process, run_time):
+        return f"Running {process} (priority={process.priority}) for {run_time} unit(s)"
+
+# Linux's nice-to-weight table: each nice level is worth about 10% CPU.
+NICE_0_WEIGHT = 1024
+NICE_TO_WEIGHT = [
+    88761, 71755, 56483, 46273, 36291,
+    29154, 23254, 18705, 14949, 11916,
+    9548, 7620, 6100, 4904, 3906,
+    3121, 2501, 1991, 1586, 1277,
+    1024, 820, 655, 526, 423,
+    335, 272, 215, 172, 137,
+    110, 87, 70, 56, 45,
+    36, 29, 23, 18, 15,
+]
+
+def nice_weight(priority):
+    # Process.priority is used as a nice value, clamped to -20..19.
+    return NICE_TO_WEIGHT[min(max(priority, -20), 19) + 20]
+
+class FairScheduler(Scheduler):
+    # CFS-style: always run the ready process with the smallest virtual runtime.
+    # Running for t units adds t * NICE_0_WEIGHT / weight to a process's
+    # vruntime, so higher-weight (lower priority number) processes get
+    # proportionally more CPU. Ready processes sit in a heap keyed by vruntime
+    # (a waiting process's vruntime never changes), so pick-next is O(log n).
+    #
+    # Each slice is the process's weighted share of `latency`, but at least
+    # `min_granularity`. A process that arrives with a vruntime more than
+    # `wakeup_granularity` below the running one preempts it.
+    name = "Fair (CFS)"
+
+    def __init__(self, latency=6, min_granularity=1, wakeup_granularity=1, quiet=False, pacing=0.0):
+        super().__init__(quiet, pacing)
+        self.latency = latency
+        self.min_granularity = min_granularity
+        self.wakeup_granularity = wakeup_granularity
+        self.heap = []  # [vruntime, arrival counter, process, weight]
+        self.arrival_counter = 0
+        self.ready = 0
+        self.ready_weight = 0  # total weight of the ready processes
+        self.min_vruntime = 0  # never decreases; new arrivals start here
+        self.running_weight = NICE_0_WEIGHT
+
+    def _start_message(self):
+        return f"Starting Fair (CFS) Scheduling with latency = {self.latency}"
+
+    def _enqueue(self, process):
+        # Newcomers (and processes migrated from another CPU) start no earlier
+        # than min_vruntime, so they cannot monopolize the CPU to catch up.
+        if process.vruntime < self.min_vruntime:
+            process.vruntime = self.min_vruntime
+        weight = nice_weight(process.priority)
+        heapq.heappush(self.heap, [process.vruntime, self.arrival_counter, process, weight])
+        self.arrival_counter += 1
+        self.ready += 1
+        self.ready_weight += weight
+
+    def _pop_entry(self, entry):
+        self.ready -= 1
+        self.ready_weight -= entry[3]
+        return entry[2]
+
+    def _peek(self):
+        heap = self.heap
+        while heap[0][2] is REMOVED:
+            heapq.heappop(heap)
+        return heap[0]
+
+    def _pick(self):
+        heap = self.heap
+        while True:
+            entry = heapq.heappop(heap)
+            if entry[2] is not REMOVED:
+                self.running_weight = entry[3]
+                if entry[0] > self.min_vruntime:
+                    self.min_vruntime = entry[0]
+                return self._pop_entry(entry)
+
+    def _ready_count(self):
+        return self.ready
+
+    def _steal(self, allowed, scan=32):
+        # Heap leaves hold the largest vruntimes: the processes needing the CPU least.
+        entry = steal_entry(self.heap, allowed, scan)
+        if entry is None:
+            return None
+        process = self._pop_entry(entry)
+        entry[2] = REMOVED
+        return process
+
+    def _time_slice(self, process):
+        weight = self.running_weight
+        share = self.latency * weight // (weight + self.ready_weight)
+        if share < self.min_granularity:
+            share = self.min_granularity
+        return share if share < process.remaining_time else process.remaining_time
+
+    def _charge(self, process, run_time):
+        process.vruntime += run_time * NICE_0_WEIGHT / self.running_weight
+
+    def _current_vruntime(self, process):
+        run_time = self.current_time - self.slice_start
+        return process.vruntime + run_time * NICE_0_WEIGHT / self.running_weight
+
+    def _end_slice(self, process):
+        self._charge(process, self.slice_length)
+        super()._end_slice(process)
+
+    def _preempt(self):
+        self._charge(self.running, self.current_time - self.slice_start)
+        super()._preempt()
+
+    def _should_preempt(self, process):
+        return self._peek()[0] + self.wakeup_granularity < self._current_vruntime(process)
+
+    def _dispatch_message(self, process, run_time):
+        return f"Running {process} (vruntime={process.vruntime:.2f}) for {run_time} unit(s)"
+
+class MLFQScheduler(Scheduler):
+    # Multi-level feedback queue. Level 0 is the highest; the CPU always runs
+    # the first process of the highest non-empty level, round-robin within a
+    # level. New processes start at level 0. A process that has used up its
+    # level's quantum (over any number of slices) moves down a level, so CPU
+    # hogs sink while short interactive jobs stay on top. Every `boost_period`
+    # time units all processes go back to level 0, so nothing starves.
+    # With preemptive=True a process entering a higher level takes the CPU.
+    name = "MLFQ"
+
+    def __init__(self, quanta=(1, 2, 4), boost_period=50, preemptive=True, quiet=False, pacing=0.0):
+        super().__init__(quiet, pacing)
+        if not quanta:
+            raise ValueError("MLFQ needs at least one level")
+        self.quanta = list(quanta)  # quantum of each level, highest level first
+        self.boost_period = boost_period  # 0/None disables priority boosts
+        self.preemptive = preemptive
+        self.levels = [deque() for _ in self.quanta]
+        self.ready = 0
+        self.next_boost = boost_period or None
+
+    def _start_message(self):
+        quanta = ', '.join(str(q) for q in self.quanta)
+        boost = f", boost every {self.boost_period}" if self.boost_period else ""
+        return f"Starting MLFQ Scheduling with quanta = [{quanta}]{boost}"
+
+    def _boost(self):
+        # Priority boost: move every waiting process to the top level, keeping
+        # their order. The running process is reset too and rejoins at level 0.
+        # Only scheduling decisions observe levels, so this is done lazily at
+        # the first enqueue/pick at or after the boost time.
+        period = self.boost_period
+        self.next_boost = (self.current_time // period + 1) * period
+        top = self.levels[0]
+        for queue in self.levels[1:]:
+            for process in queue:
+                process.level = 0
+                process.quantum_used = 0
+            top.extend(queue)
+            queue.clear()
+        if self.running is not None:
+            self.running.level = 0
+            self.running.quantum_used = 0
+        self._log(f"Priority boost at time {self.current_time}")
+
+    def _enqueue(self, process):
+        if self.next_boost is not None and self.current_time >= self.next_boost:
+            self._boost()
+        self.levels[process.level].append(process)
+        self.ready += 1
+
+    def _top_level(self):
+        for level, queue in enumerate(self.levels):
+            if queue:
+                return level
+        return None
+
+    def _pick(self):
+        if self.next_boost is not None and self.current_time >= self.next_boost:
+            self._boost()
+        self.ready -= 1
+        return self.levels[self._top_level()].popleft()
+
+    def _ready_count(self):
+        return self.ready
+
+    def _steal(self, allowed, scan=32):
+        # Take from the bottom: the process that would wait longest here.
+        for queue in reversed(self.levels):
+            for i in range(len(queue) - 1, max(len(queue) - scan, 0) - 1, -1):
+                if allowed(queue[i]):
+                    process = queue[i]
+                    del queue[i]
+                    self.ready -= 1
+                    return process
+        return None
+
+    def _time_slice(self, process):
+        return min(self.quanta[process.level] - process.quantum_used, process.remaining_time)
+
+    def _charge(self, process, run_time):
+        process.quantum_used += run_time
+        if process.quantum_used >= self.quanta[process.level]:
+            process.quantum_used = 0
+            if process.level < len(self.quanta) - 1:
+                process.level += 1
+
+    def _end_slice(self, process):
+        self._charge(process, self.slice_length)
+        super()._end_slice(process)
+
+    def _preempt(self):
+        self._charge(self.running, self.current_time - self.slice_start)
+        super()._preempt()
+
+    def _should_preempt(self, process):
+        if not self.preemptive:
+            return False
+        return self._top_level() < process.level
+
+    def _dispatch_message(self, process, run_time):
+        return f"Running {process} at level {process.level} for {run_time} unit(s)"
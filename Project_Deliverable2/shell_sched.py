@@ -1,15 +1,41 @@
 # Shell interface for process scheduling simulation
 # Allows user to select scheduling algorithm, add processes, and start simulation
 
-from scheduler import Process, RoundRobinScheduler, PriorityScheduler
+from scheduler import Process, RoundRobinScheduler, PriorityScheduler, FairScheduler, MLFQScheduler
+from smp import SMPScheduler
+import workload
 
-# Placeholder for shell logic
+# Real seconds per unit of simulated time, so the demo plays out at a readable pace.
+DEMO_PACING = 0.1
+# Loaded traces larger than this run at full speed without per-event output.
+QUIET_TRACE_SIZE = 100
+
+
+def build_scheduler(make_cpu, num_cpus):
+    # One CPU: the policy itself. More: an SMP simulation with one queue per CPU.
+    if num_cpus == 1:
+        scheduler = make_cpu()
+        scheduler.pacing = DEMO_PACING
+        return scheduler
+    return SMPScheduler(make_cpu, num_cpus, pacing=DEMO_PACING)
+
+
+def policy_of(scheduler):
+    return scheduler.cpus[0] if isinstance(scheduler, SMPScheduler) else scheduler
+
+
+def make_quiet(scheduler):
+    scheduler.quiet = True
+    scheduler.pacing = 0.0
+    for cpu in getattr(scheduler, 'cpus', []):
+        cpu.quiet = True
 
 
 def main():
     print("Welcome to the Process Scheduling Shell!")
     scheduler = None
     time_slice = 1
+    num_cpus = 1
     pid_counter = 1
     while True:
         print("\nMenu:")
@@ -17,18 +43,50 @@ def main():
         print("2. Set Time Slice (Round-Robin)")
         print("3. Add Process")
         print("4. Start Scheduling Simulation")
-        print("5. Exit")
+        print("5. Set Number of CPUs (SMP)")
+        print("6. Export Metrics of Last Run (CSV/JSON)")
+        print("7. Load Processes from Trace File (CSV/JSONL)")
+        print("8. Compare Algorithms on a Workload")
+        print("9. Exit")
         choice = input("Enter your choice: ")
         if choice == '1':
             print("a. Round-Robin Scheduling")
             print("b. Priority-Based Scheduling")
-            algo = input("Select algorithm (a/b): ")
+            print("c. Preemptive Priority Scheduling (with aging)")
+            print("d. Fair Scheduling (CFS-style)")
+            print("e. Multi-Level Feedback Queue (MLFQ)")
+            algo = input("Select algorithm (a/b/c/d/e): ")
             if algo == 'a':
-                scheduler = RoundRobinScheduler(time_slice)
+                scheduler = build_scheduler(lambda: RoundRobinScheduler(time_slice), num_cpus)
                 print("Round-Robin selected.")
             elif algo == 'b':
-                scheduler = PriorityScheduler()
+                scheduler = build_scheduler(lambda: PriorityScheduler(), num_cpus)
                 print("Priority-Based selected.")
+            elif algo == 'c':
+                rate = input("Enter aging rate (priority levels gained per time unit waited, 0 = none): ")
+                try:
+                    rate = float(rate or 0)
+                except ValueError:
+                    print("Invalid aging rate.")
+                    continue
+                scheduler = build_scheduler(lambda: PriorityScheduler(preemptive=True, aging_rate=rate), num_cpus)
+                print("Preemptive Priority selected.")
+            elif algo == 'd':
+                scheduler = build_scheduler(lambda: FairScheduler(), num_cpus)
+                print("Fair (CFS) selected. Priority is used as a nice value (-20..19).")
+            elif algo == 'e':
+                quanta = input("Enter quantum of each level, highest first (comma-separated, blank = 1,2,4): ")
+                boost = input("Enter priority boost period (integer, blank = 50, 0 = never): ")
+                try:
+                    quanta = [int(q) for q in quanta.split(',')] if quanta.strip() else [1, 2, 4]
+                    boost = int(boost) if boost.strip() else 50
+                    if min(quanta) < 1 or boost < 0:
+                        raise ValueError
+                except ValueError:
+                    print("Invalid MLFQ settings.")
+                    continue
+                scheduler = build_scheduler(lambda: MLFQScheduler(quanta, boost), num_cpus)
+                print("MLFQ selected.")
             else:
                 print("Invalid selection.")
         elif choice == '2':
@@ -36,28 +94,48 @@ def main():
             try:
                 time_slice = int(ts)
                 print(f"Time slice set to {time_slice}.")
-                if isinstance(scheduler, RoundRobinScheduler):
-                    scheduler.time_slice = time_slice
+                cpus = scheduler.cpus if isinstance(scheduler, SMPScheduler) else [scheduler]
+                for cpu in cpus:
+                    if isinstance(cpu, RoundRobinScheduler):
+                        cpu.time_slice = time_slice
             except ValueError:
                 print("Invalid time slice.")
         elif choice == '3':
+            if scheduler is None:
+                print("Select a scheduling algorithm first.")
+                continue
             burst = input("Enter burst time (integer): ")
             try:
                 burst = int(burst)
             except ValueError:
                 print("Invalid burst time.")
                 continue
-            if isinstance(scheduler, PriorityScheduler):
+            arrival = input("Enter arrival time (integer, blank = 0): ")
+            try:
+                arrival = int(arrival) if arrival.strip() else None
+            except ValueError:
+                print("Invalid arrival time.")
+                continue
+            if isinstance(policy_of(scheduler), (PriorityScheduler, FairScheduler)):
                 prio = input("Enter priority (lower number = higher priority): ")
                 try:
                     prio = int(prio)
                 except ValueError:
                     print("Invalid priority.")
                     continue
-                proc = Process(pid_counter, burst, prio)
+                proc = Process(pid_counter, burst, prio, arrival)
             else:
-                proc = Process(pid_counter, burst)
-            scheduler.add_process(proc)
+                proc = Process(pid_counter, burst, arrival_time=arrival)
+            if isinstance(scheduler, SMPScheduler):
+                cpus = input(f"Enter allowed CPUs (comma-separated, 0-{num_cpus - 1}, blank = any): ")
+                try:
+                    proc.affinity = {int(c) for c in cpus.split(',')} if cpus.strip() else None
+                    scheduler.add_process(proc)
+                except ValueError as e:
+                    print(f"Invalid CPU list. {e}")
+                    continue
+            else:
+                scheduler.add_process(proc)
             print(f"Process {pid_counter} added.")
             pid_counter += 1
         elif choice == '4':
@@ -65,7 +143,68 @@ def main():
                 print("Select a scheduling algorithm first.")
             else:
                 scheduler.run()
+                if scheduler.quiet:
+                    scheduler.print_metrics()
+                    if isinstance(scheduler, SMPScheduler):
+                        scheduler.print_smp_metrics()
         elif choice == '5':
+            n = input("Enter number of CPUs (integer): ")
+            try:
+                n = int(n)
+                if n < 1:
+                    raise ValueError
+            except ValueError:
+                print("Invalid number of CPUs.")
+                continue
+            num_cpus = n
+            print(f"Number of CPUs set to {num_cpus}. Select an algorithm to apply it.")
+        elif choice == '6':
+            if scheduler is None or not len(scheduler.metrics):
+                print("Run a simulation first.")
+                continue
+            path = input("Enter output file (.csv or .json): ").strip()
+            try:
+                scheduler.export_metrics(path)
+                print(f"Metrics for {len(scheduler.metrics)} processes written to {path}.")
+            except OSError as e:
+                print(f"Error writing {path}: {e}")
+        elif choice == '7':
+            if scheduler is None:
+                print("Select a scheduling algorithm first.")
+                continue
+            path = input("Enter trace file (.csv or .jsonl): ").strip()
+            count = 0
+            try:
+                for proc in workload.load_trace(path):
+                    scheduler.add_process(proc)
+                    pid_counter = max(pid_counter, proc.pid + 1)
+                    count += 1
+            except (OSError, ValueError) as e:
+                print(f"Error loading trace: {e}")
+            print(f"{count} processes added.")
+            if count > QUIET_TRACE_SIZE:
+                make_quiet(scheduler)
+                print("Large trace: the simulation will run without per-event output.")
+        elif choice == '8':
+            path = input("Enter trace file (blank = synthetic workload): ").strip()
+            if path:
+                spec = ('trace', path)
+            else:
+                n = input("Enter number of synthetic processes (integer, blank = 10000): ")
+                try:
+                    spec = ('synthetic', {'n': int(n) if n.strip() else 10000})
+                except ValueError:
+                    print("Invalid number of processes.")
+                    continue
+            algos = input(f"Enter algorithms (blank = {workload.DEFAULT_ALGORITHMS}): ").strip()
+            algos = [a.strip() for a in (algos or workload.DEFAULT_ALGORITHMS).split(',') if a.strip()]
+            try:
+                for a in algos:
+                    workload.make_scheduler(a)
+                workload.print_comparison(workload.compare(spec, algos))
+            except (OSError, ValueError) as e:
+                print(f"Error: {e}")
+        elif choice == '9':
             print("Exiting shell.")
             break
         else:
@@ -0,0 +1,283 @@
+# Multiprocessor (SMP) scheduling simulation
+#
+# SMPScheduler runs N simulated CPUs on one shared event heap. Each CPU is an
+# ordinary single-CPU scheduler (Round-Robin, Priority, ...) built by the
+# `make_cpu` factory and used as that CPU's private run queue, so every policy
+# works unchanged on SMP. On top of that:
+#   - arrivals are placed on the least loaded CPU they are allowed to run on
+#     (Process.affinity is an optional set of CPU ids);
+#   - every `balance_interval` time units the busiest and idlest CPUs are
+#     evened out (periodic load balancing);
+#   - a CPU that runs out of work immediately steals a ready process from the
+#     busiest CPU (idle work stealing).
+# A migration is counted whenever a process runs on a different CPU than last time.
+
+import bisect
+import heapq
+
+from scheduler import ARRIVAL, SLICE_END, WAKEUP, Scheduler
+
+BALANCE = 3  # periodic load-balancing event (handled after everything else at its instant)
+
+class SMPScheduler(Scheduler):
+    def __init__(self, make_cpu, num_cpus=2, balance_interval=10, steal=True, quiet=False, pacing=0.0):
+        super().__init__(quiet, pacing)
+        if num_cpus < 1:
+            raise ValueError("num_cpus must be at least 1")
+        self.balance_interval = balance_interval  # 0/None disables periodic balancing
+        self.steal = steal
+        self.num_cpus = num_cpus
+        self.cpus = []
+        for cpu_id in range(num_cpus):
+            cpu = make_cpu()
+            # All CPUs post to this scheduler's event heap and metrics.
+            cpu.events = self.events
+            cpu.counter = self.counter
+            cpu.metrics = self.metrics
+            cpu.quiet = quiet
+            cpu.pacing = 0.0
+            cpu.label = f"CPU {cpu_id}: " if num_cpus > 1 else ""
+            cpu.cpu_id = cpu_id
+            cpu.busy_time = 0
+            cpu.completed = 0
+            self.cpus.append(cpu)
+        self.name = f"SMP {self.cpus[0].name} x {num_cpus} CPUs"
+        self.idle = list(range(num_cpus))  # ids of idle CPUs, kept sorted
+        # Load ordering, kept up to date as loads change (see _refresh) rather
+        # than re-sorted at every event. Both heaps use lazy deletion: an
+        # entry is live only if it matches the CPU's current value below.
+        self.loads = [0] * num_cpus           # cpu id -> load
+        self.load_heap = [(0, c) for c in range(num_cpus)]  # (load, cpu id), for placement
+        self.ready_loads = [None] * num_cpus  # cpu id -> load if it has ready work, else None
+        self.victim_heap = []                 # (-load, cpu id) of CPUs with ready work
+        self.migrations = 0
+        self.steals = 0
+        self.balance_moves = 0
+
+    def add_process(self, process):
+        if process.affinity is not None and not any(0 <= c < len(self.cpus) for c in process.affinity):
+            raise ValueError(f"process {process.pid} has no usable CPU in its affinity {sorted(process.affinity)}")
+        super().add_process(process)
+
+    def _stale(self, event):
+        # A cancelled slice: its process's CPU has moved on to another slice.
+        return event[1] == SLICE_END and event[2] != self.cpus[event[3].cpu].slice_seq
+
+    def _start_message(self):
+        return f"Starting {self.name}: {self.cpus[0]._start_message()}"
+
+    @staticmethod
+    def _allowed(process, cpu_id):
+        return process.affinity is None or cpu_id in process.affinity
+
+    @staticmethod
+    def _load(cpu):
+        return cpu._ready_count() + (cpu.running is not None)
+
+    def _refresh(self, cpu):
+        # Record a change in cpu's load or ready work in the load ordering.
+        i = cpu.cpu_id
+        load = self._load(cpu)
+        if load != self.loads[i]:
+            self.loads[i] = load
+            heapq.heappush(self.load_heap, (load, i))
+        ready = load if cpu._ready_count() else None
+        if ready != self.ready_loads[i]:
+            self.ready_loads[i] = ready
+            if ready is not None:
+                heapq.heappush(self.victim_heap, (-ready, i))
+        limit = 4 * len(self.cpus) + 64
+        if len(self.load_heap) > limit:
+            self.load_heap = [(load, c) for c, load in enumerate(self.loads)]
+            heapq.heapify(self.load_heap)
+        if len(self.victim_heap) > limit:
+            self.victim_heap = [(-load, c) for c, load in enumerate(self.ready_loads) if load is not None]
+            heapq.heapify(self.victim_heap)
+
+    def _place(self, process):
+        # Least loaded allowed CPU; ties go to the lowest CPU id.
+        cpus = self.cpus
+        if process.affinity is None:
+            heap = self.load_heap
+            while heap[0][0] != self.loads[heap[0][1]]:
+                heapq.heappop(heap)
+            return cpus[heap[0][1]]
+        candidates = [cpus[c] for c in sorted(process.affinity) if 0 <= c < len(cpus)]
+        return min(candidates, key=self._load)
+
+    def _dispatch_on(self, cpu):
+        cpu._dispatch()
+        self._note_dispatch(cpu)
+
+    def _note_dispatch(self, cpu):
+        process = cpu.running
+        if process.cpu is not None and process.cpu != cpu.cpu_id:
+            self.migrations += 1
+        process.cpu = cpu.cpu_id
+        i = bisect.bisect_left(self.idle, cpu.cpu_id)
+        if i < len(self.idle) and self.idle[i] == cpu.cpu_id:
+            del self.idle[i]
+
+    def _has_victim(self):
+        # Whether any CPU has ready work, dropping dead entries off the top.
+        heap = self.victim_heap
+        while heap and -heap[0][0] != self.ready_loads[heap[0][1]]:
+            heapq.heappop(heap)
+        return bool(heap)
+
+    def _steal_for(self, cpu):
+        # Idle work stealing: take one ready process from the most loaded CPU
+        # that has one this CPU may run. Victims are popped in load order and
+        # pushed back afterwards.
+        cpu_id = cpu.cpu_id
+        heap = self.victim_heap
+        tried = []
+        stolen = None
+        while heap:
+            entry = heapq.heappop(heap)
+            load, i = -entry[0], entry[1]
+            if load != self.ready_loads[i] or (tried and entry == tried[-1]):
+                continue  # dead or duplicate entry
+            tried.append(entry)
+            if i == cpu_id:
+                continue
+            process = self.cpus[i]._steal(lambda p: self._allowed(p, cpu_id))
+            if process is not None:
+                cpu._enqueue(process)
+                self.steals += 1
+                stolen = self.cpus[i]
+                break
+        for entry in tried:
+            heapq.heappush(heap, entry)
+        if stolen is None:
+            return False
+        self._refresh(stolen)
+        return True
+
+    def _balance(self, touched):
+        cpus = self.cpus
+        loads = [self._load(cpu) for cpu in cpus]
+        for _ in range(4 * len(cpus)):  # bound the work done per balancing round
+            busiest = max(range(len(cpus)), key=loads.__getitem__)
+            idlest = min(range(len(cpus)), key=loads.__getitem__)
+            if loads[busiest] - loads[idlest] <= 1:
+                break
+            process = cpus[busiest]._steal(lambda p: self._allowed(p, idlest))
+            if process is None:
+                break  # what is left is pinned by affinity
+            cpus[idlest]._enqueue(process)
+            loads[busiest] -= 1
+            loads[idlest] += 1
+            self.balance_moves += 1
+            touched[cpus[idlest]] = None
+            self._refresh(cpus[busiest])
+            self._refresh(cpus[idlest])
+
+    def _settle(self, touched):
+        # Once every event at this instant is handled: start or preempt work on
+        # the CPUs that changed, then let idle CPUs steal.
+        for cpu in touched:
+            if not cpu._ready_count():
+                if cpu.running is None:
+                    i = bisect.bisect_left(self.idle, cpu.cpu_id)
+                    if i == len(self.idle) or self.idle[i] != cpu.cpu_id:
+                        self.idle.insert(i, cpu.cpu_id)
+                continue
+            if cpu.running is None:
+                self._dispatch_on(cpu)
+                self._refresh(cpu)
+            elif cpu._should_preempt(cpu.running):
+                cpu.busy_time += cpu.current_time - cpu.slice_start
+                cpu._preempt()
+                self._note_dispatch(cpu)
+        if self.steal and self.idle and len(self.cpus) > 1 and self._has_victim():
+            for cpu_id in list(self.idle):
+                cpu = self.cpus[cpu_id]
+                cpu.current_time = self.current_time
+                if self._steal_for(cpu):
+                    self._dispatch_on(cpu)
+                    self._refresh(cpu)
+                elif not self._has_victim():
+                    break
+
+    def run(self):
+        self._log(self._start_message())
+        events = self.events
+        cpus = self.cpus
+        if self.balance_interval and events and len(cpus) > 1:
+            self._schedule(self.current_time + self.balance_interval, BALANCE, None)
+        touched = {}  # CPUs changed at this instant, in order
+        while events:
+            event = heapq.heappop(events)
+            if self._stale(event):
+                continue
+            when, kind, seq, payload = event
+            if kind == SLICE_END:
+                cpu = cpus[payload.cpu]
+            if self.pacing:
+                self._advance(when)
+            else:
+                self.current_time = when
+            if kind == ARRIVAL:
+                cpu = self._place(payload)
+                cpu.current_time = when
+                cpu._enqueue(payload)
+            elif kind == SLICE_END:
+                cpu.current_time = when
+                cpu.busy_time += cpu.slice_length
+                cpu._end_slice(payload)
+                if payload.completion_time is not None:
+                    cpu.completed += 1
+            elif kind == WAKEUP:
+                cpu = payload
+            else:
+                if events:
+                    # Sleep through idle gaps instead of ticking every interval.
+                    self._schedule(max(when + self.balance_interval, events[0][0]), BALANCE, None)
+                for cpu in cpus:
+                    cpu.current_time = when
+                self._balance(touched)
+                cpu = None
+            if cpu is not None:
+                cpu.current_time = when
+                touched[cpu] = None
+                self._refresh(cpu)
+            if self._more_now(when):
+                continue
+            self._settle(touched)
+            touched.clear()
+        if not self.quiet:
+            self.print_metrics()
+            self.print_smp_metrics()
+        return self.metrics
+
+    def smp_stats(self):
+        completed = len(self.metrics)
+        if completed:
+            columns = self.metrics.columns
+            makespan = max(columns['completion']) - min(columns['arrival'])
+            if makespan == int(makespan):
+                makespan = int(makespan)
+        else:
+            makespan = 0
+        return {
+            'cpus': len(self.cpus),
+            'completed': completed,
+            'makespan': makespan,
+            'throughput': completed / makespan if makespan else 0.0,
+            'migrations': self.migrations,
+            'steals': self.steals,
+            'balance_moves': self.balance_moves,
+            'cpu_busy': [cpu.busy_time for cpu in self.cpus],
+            'cpu_utilization': [cpu.busy_time / makespan if makespan else 0.0 for cpu in self.cpus],
+            'cpu_completed': [cpu.completed for cpu in self.cpus],
+        }
+
+    def print_smp_metrics(self):
+        stats = self.smp_stats()
+        print(f"\nSMP Metrics ({stats['cpus']} CPUs):")
+        print(f"Migrations: {stats['migrations']}  Steals: {stats['steals']}  Balance moves: {stats['balance_moves']}")
+        print("CPU | Busy | Utilization | Completed")
+        for cpu_id, (busy, util, done) in enumerate(zip(stats['cpu_busy'], stats['cpu_utilization'],
+                                                        stats['cpu_completed'])):
+            print(f"{cpu_id:3} | {busy:4} | {util:10.1%} | {done:9}")
@@ -0,0 +1,189 @@
+# Workload traces and algorithm comparison
+#
+# A trace is a CSV file with a header row (pid, arrival, burst, priority) or a
+# JSONL file with one {"pid": ..., "arrival": ..., "burst": ..., "priority": ...}
+# object per line. `arrival` and `priority` are optional. Traces are read
+# lazily, one process at a time.
+#
+# Command line:
+#     python3 workload.py generate -n 10000 --rate 0.15 --out trace.csv
+#     python3 workload.py compare trace.csv --algorithms rr:1,rr:4,rr:16,priority
+#     python3 workload.py compare --synthetic 50000 --workers 4
+#
+# `compare` runs every algorithm on the same workload in parallel worker
+# processes and prints their metrics side by side.
+
+import argparse
+import csv
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from scheduler import Process, RoundRobinScheduler, PriorityScheduler, FairScheduler, MLFQScheduler
+
+DEFAULT_ALGORITHMS = "rr:1,rr:2,rr:4,rr:8,priority"
+
+# ---------------------- Traces ----------------------
+
+def _number(text):
+    return float(text) if any(c in text for c in '.eE') else int(text)
+
+def _is_jsonl(path):
+    return path.endswith(('.jsonl', '.json'))
+
+def _process_from_row(row, where):
+    try:
+        arrival = row.get('arrival')
+        priority = row.get('priority')
+        if isinstance(arrival, str):
+            arrival = _number(arrival) if arrival.strip() else None
+        if isinstance(priority, str):
+            priority = _number(priority) if priority.strip() else None
+        burst = row['burst']
+        burst = _number(burst) if isinstance(burst, str) else burst
+        if burst <= 0:
+            raise ValueError("burst must be positive")
+        return Process(int(row['pid']), burst, priority or 0, arrival)
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"{where}: bad trace row {row!r} ({e})") from None
+
+def load_trace(path):
+    # Yield the processes of a CSV or JSONL trace without reading it all at once.
+    with open(path, newline='') as f:
+        if _is_jsonl(path):
+            for lineno, line in enumerate(f, 1):
+                if line.strip():
+                    yield _process_from_row(json.loads(line), f"{path}:{lineno}")
+        else:
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield _process_from_row(row, f"{path}:{reader.line_num}")
+
+def save_trace(processes, path):
+    with open(path, 'w', newline='') as f:
+        if _is_jsonl(path):
+            for p in processes:
+                f.write(json.dumps({'pid': p.pid, 'arrival': p.arrival_time,
+                                    'burst': p.burst_time, 'priority': p.priority}) + '\n')
+        else:
+            writer = csv.writer(f)
+            writer.writerow(('pid', 'arrival', 'burst', 'priority'))
+            for p in processes:
+                writer.writerow((p.pid, p.arrival_time, p.burst_time, p.priority))
+
+def generate(n, rate=0.15, burst_alpha=1.5, min_burst=2, max_burst=1000, priorities=10, seed=0):
+    # Synthetic workload: Poisson arrivals (exponential gaps with mean 1/rate)
+    # and Pareto-distributed bursts with shape `burst_alpha`, so most jobs are
+    # short and a few are very long. Times are rounded to whole units.
+    rng = random.Random(seed)
+    clock = 0.0
+    for pid in range(1, n + 1):
+        clock += rng.expovariate(rate)
+        burst = min(max_burst, int(min_burst * rng.paretovariate(burst_alpha)))
+        yield Process(pid, max(burst, min_burst), rng.randrange(priorities), int(clock))
+
+# ---------------------- Comparison ----------------------
+
+def make_scheduler(algorithm):
+    # "rr:4" -> Round-Robin with time slice 4; "priority", "priority-preemptive",
+    # "cfs" and "mlfq" select the other schedulers.
+    name, _, arg = algorithm.partition(':')
+    if name == 'rr':
+        return RoundRobinScheduler(int(arg or 1), quiet=True)
+    if name == 'priority':
+        return PriorityScheduler(quiet=True)
+    if name == 'priority-preemptive':
+        return PriorityScheduler(preemptive=True, aging_rate=float(arg or 0), quiet=True)
+    if name == 'cfs':
+        return FairScheduler(quiet=True)
+    if name == 'mlfq':
+        return MLFQScheduler(quiet=True)
+    raise ValueError(f"unknown algorithm {algorithm!r}")
+
+def workload_processes(workload):
+    # `workload` is ("trace", path) or ("synthetic", generate() keyword arguments).
+    kind, arg = workload
+    return load_trace(arg) if kind == 'trace' else generate(**arg)
+
+def run_algorithm(workload, algorithm):
+    # Runs in a worker process: each worker rebuilds the workload itself, so
+    # only a small summary dict is sent back.
+    scheduler = make_scheduler(algorithm)
+    for process in workload_processes(workload):
+        scheduler.add_process(process)
+    scheduler.run()
+    return scheduler.metrics.summary()
+
+def compare(workload, algorithms, workers=None):
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_algorithm, workload, a) for a in algorithms]
+        return [(a, f.result()) for a, f in zip(algorithms, futures)]
+
+ROWS = [
+    ('Processes', 'processes', '{:.0f}'),
+    ('Makespan', 'makespan', '{:.0f}'),
+    ('Throughput', 'throughput', '{:.4f}'),
+    ('CPU util', 'cpu_utilization', '{:.1%}'),
+    ('Fairness', 'fairness', '{:.3f}'),
+    ('Ctx switches', 'context_switches', '{:.0f}'),
+    ('Waiting mean', 'waiting_mean', '{:.2f}'),
+    ('Waiting p95', 'waiting_p95', '{:.2f}'),
+    ('Waiting p99', 'waiting_p99', '{:.2f}'),
+    ('Turnaround mean', 'turnaround_mean', '{:.2f}'),
+    ('Turnaround p99', 'turnaround_p99', '{:.2f}'),
+    ('Response mean', 'response_mean', '{:.2f}'),
+    ('Response p99', 'response_p99', '{:.2f}'),
+]
+
+def print_comparison(results):
+    width = max(12, *(len(a) for a, _ in results))
+    print(f"{'Metric':16}" + ''.join(f" | {a:>{width}}" for a, _ in results))
+    print('-' * (16 + (width + 3) * len(results)))
+    for label, key, fmt in ROWS:
+        cells = [fmt.format(stats[key]) if key in stats else '-' for _, stats in results]
+        print(f"{label:16}" + ''.join(f" | {c:>{width}}" for c in cells))
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate workloads and compare scheduling algorithms.")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    gen = sub.add_parser('generate', help="Write a synthetic trace.")
+    gen.add_argument('-n', type=int, default=1000, help="Number of processes (default 1000).")
+    gen.add_argument('--rate', type=float, default=0.15, help="Mean arrivals per time unit (default 0.15).")
+    gen.add_argument('--alpha', type=float, default=1.5, help="Pareto shape of burst times (default 1.5).")
+    gen.add_argument('--max-burst', type=int, default=1000)
+    gen.add_argument('--seed', type=int, default=0)
+    gen.add_argument('--out', required=True, help="Output trace (.csv or .jsonl).")
+
+    cmp_ = sub.add_parser('compare', help="Run several algorithms on one workload.")
+    cmp_.add_argument('trace', nargs='?', help="Trace file (.csv or .jsonl).")
+    cmp_.add_argument('--synthetic', type=int, metavar='N', help="Use N generated processes instead of a trace.")
+    cmp_.add_argument('--rate', type=float, default=0.15)
+    cmp_.add_argument('--seed', type=int, default=0)
+    cmp_.add_argument('--algorithms', default=DEFAULT_ALGORITHMS,
+                      help=f"Comma-separated: rr:SLICE, priority, priority-preemptive[:AGING], "
+                           f"cfs, mlfq (default {DEFAULT_ALGORITHMS}).")
+    cmp_.add_argument('--workers', type=int, default=os.cpu_count(), help="Worker processes.")
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        save_trace(generate(args.n, args.rate, args.alpha, max_burst=args.max_burst, seed=args.seed), args.out)
+        print(f"Wrote {args.n} processes to {args.out}")
+        return
+    if args.synthetic:
+        workload = ('synthetic', {'n': args.synthetic, 'rate': args.rate, 'seed': args.seed})
+    elif args.trace:
+        workload = ('trace', args.trace)
+    else:
+        parser.error("compare needs a trace file or --synthetic N")
+    algorithms = [a.strip() for a in args.algorithms.split(',') if a.strip()]
+    try:
+        for a in algorithms:
+            make_scheduler(a)  # fail on a bad name before starting workers
+    except ValueError as e:
+        parser.error(str(e))
+    print_comparison(compare(workload, algorithms, args.workers))
+
+if __name__ == "__main__":
+    main()
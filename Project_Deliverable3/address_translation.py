@@ -0,0 +1,245 @@
+# Virtual address translation: multi-level page table + set-associative TLB
+#
+# MMU translates (process_id, virtual address) pairs the way paging hardware
+# does. A virtual address is split into a virtual page number (VPN) and an
+# offset within the page. The TLB is looked up first. On a TLB miss, the
+# process's page table is walked one level at a time; each level costs one
+# memory read. A missing entry is a page fault: MemoryManager acts as the
+# physical frame allocator and loads the page, evicting another with its own
+# replacement policy. The evicted page's page-table entry and TLB entry are
+# invalidated.
+#
+# Command line (trace lines are "va" or "pid va"; hex like 0x7fff1000 is fine):
+#     python3 address_translation.py trace.txt --levels 4 --va-bits 48 --tlb 16x4 --frames 256
+
+import argparse
+import random
+from collections import OrderedDict
+
+from replacement import POLICIES
+from shell_mem_sync import MemoryManager
+
+TLB_POLICIES = ('LRU', 'FIFO', 'RANDOM')
+
+def read_va_trace(path):
+    # Yield (process_id, virtual_address) pairs; a lone address belongs to process 1.
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.replace(',', ' ').split()
+            try:
+                if len(fields) == 1:
+                    yield 1, int(fields[0], 0)
+                elif len(fields) == 2:
+                    yield int(fields[0], 0), int(fields[1], 0)
+                else:
+                    raise ValueError("expected 'va' or 'pid va'")
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: bad address {line!r} ({e})") from None
+
+class TLB:
+    # `sets` x `ways` entries. A VPN always maps to set vpn % sets. Each set
+    # is an OrderedDict of (pid, vpn) -> frame, oldest/least recently used first.
+    def __init__(self, sets=16, ways=4, policy='LRU', seed=0):
+        if policy not in TLB_POLICIES:
+            raise ValueError(f"Unknown TLB policy {policy!r} (choose from {', '.join(TLB_POLICIES)})")
+        self.sets = [OrderedDict() for _ in range(sets)]
+        self.ways = ways
+        self.policy = policy
+        self.rng = random.Random(seed)
+
+    def lookup(self, key):
+        entries = self.sets[key[1] % len(self.sets)]
+        frame = entries.get(key)
+        if frame is not None and self.policy == 'LRU':
+            entries.move_to_end(key)
+        return frame
+
+    def insert(self, key, frame):
+        entries = self.sets[key[1] % len(self.sets)]
+        if len(entries) >= self.ways:
+            if self.policy == 'RANDOM':
+                del entries[self.rng.choice(list(entries))]
+            else:
+                entries.popitem(last=False)
+        entries[key] = frame
+
+    def invalidate(self, key):
+        self.sets[key[1] % len(self.sets)].pop(key, None)
+
+class MMU:
+    def __init__(self, memory, page_size=4096, levels=2, va_bits=32, tlb_sets=16, tlb_ways=4,
+                 tlb_policy='LRU', tlb_ns=1, memory_ns=100, fault_ns=8_000_000):
+        if not 2 <= levels <= 4:
+            raise ValueError("page table must have 2 to 4 levels")
+        if page_size < 1 or page_size & (page_size - 1):
+            raise ValueError("page size must be a power of two")
+        self.memory = memory  # MemoryManager used as the frame allocator
+        self.page_size = page_size
+        self.offset_bits = page_size.bit_length() - 1
+        vpn_bits = va_bits - self.offset_bits
+        if vpn_bits < levels:
+            raise ValueError("virtual address too small for this page size and number of levels")
+        # Split the VPN bits across the levels, the top levels taking any remainder.
+        base, extra = divmod(vpn_bits, levels)
+        widths = [base + (1 if i < extra else 0) for i in range(levels)]
+        self.shifts = []  # right shift of the VPN for each level's index, top first
+        shift = vpn_bits
+        for width in widths:
+            shift -= width
+            self.shifts.append(shift)
+        self.index_masks = [(1 << width) - 1 for width in widths]
+        self.va_bits = va_bits
+        self.levels = levels
+        self.tlb = TLB(tlb_sets, tlb_ways, tlb_policy)
+        self.tlb_ns = tlb_ns
+        self.memory_ns = memory_ns
+        self.fault_ns = fault_ns
+        self.roots = {}  # pid -> top-level table; tables are dicts index -> next table / frame
+        self.table_count = 0
+        self.accesses = 0
+        self.tlb_hits = 0
+        self.walks = 0
+        self.walk_reads = 0  # page-table entries read by all walks
+        self.faults = 0
+        self.time_ns = 0
+
+    def _indexes(self, vpn):
+        return [(vpn >> shift) & mask for shift, mask in zip(self.shifts, self.index_masks)]
+
+    def _walk(self, pid, vpn):
+        # Returns (frame or None, levels read).
+        table = self.roots.get(pid)
+        depth = 0
+        for index in self._indexes(vpn):
+            if table is None:
+                return None, depth
+            depth += 1
+            table = table.get(index)
+        return table, depth
+
+    def _map(self, pid, vpn, frame):
+        # Create any missing intermediate tables and set the leaf entry.
+        if pid not in self.roots:
+            self.roots[pid] = {}
+            self.table_count += 1
+        table = self.roots[pid]
+        indexes = self._indexes(vpn)
+        for index in indexes[:-1]:
+            if index not in table:
+                table[index] = {}
+                self.table_count += 1
+            table = table[index]
+        table[indexes[-1]] = frame
+
+    def _unmap(self, pid, vpn):
+        table = self.roots[pid]
+        indexes = self._indexes(vpn)
+        for index in indexes[:-1]:
+            table = table[index]
+        del table[indexes[-1]]
+        self.tlb.invalidate((pid, vpn))
+
+    def translate(self, pid, va):
+        # Returns (physical address, TLB hit, page-table levels read, page fault).
+        if not 0 <= va < 1 << self.va_bits:
+            raise ValueError(f"virtual address {va:#x} outside the {self.va_bits}-bit address space")
+        vpn = va >> self.offset_bits
+        offset = va & (self.page_size - 1)
+        key = (pid, vpn)
+        self.accesses += 1
+        cost = self.tlb_ns + self.memory_ns  # TLB lookup + the access itself
+        frame = self.tlb.lookup(key)
+        tlb_hit = frame is not None
+        depth = 0
+        fault = False
+        if tlb_hit:
+            self.tlb_hits += 1
+            self.memory.access(key)  # keep the frame allocator's recency up to date
+        else:
+            frame, depth = self._walk(pid, vpn)
+            self.walks += 1
+            self.walk_reads += depth
+            cost += depth * self.memory_ns
+            result = self.memory.access(key)
+            if frame is None:
+                fault = True
+                self.faults += 1
+                cost += self.fault_ns
+                new_page, old_page = result
+                if old_page is not None:
+                    self._unmap(old_page.process_id, old_page.page_number)
+                frame = self.memory.page_table[key]
+                self._map(pid, vpn, frame)
+            self.tlb.insert(key, frame)
+        self.time_ns += cost
+        return frame * self.page_size + offset, tlb_hit, depth, fault
+
+    def run(self, references):
+        # Quiet bulk mode over (pid, virtual address) pairs; returns stats().
+        translate = self.translate
+        for pid, va in references:
+            translate(pid, va)
+        return self.stats()
+
+    def stats(self):
+        n = self.accesses
+        no_fault_ns = self.time_ns - self.faults * self.fault_ns
+        return {
+            'accesses': n,
+            'tlb_hits': self.tlb_hits,
+            'tlb_hit_rate': self.tlb_hits / n if n else 0.0,
+            'page_faults': self.faults,
+            'fault_rate': self.faults / n if n else 0.0,
+            'avg_walk_depth': self.walk_reads / self.walks if self.walks else 0.0,
+            'page_tables': self.table_count,
+            'eat_ns': self.time_ns / n if n else 0.0,
+            'eat_no_faults_ns': no_fault_ns / n if n else 0.0,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"Accesses: {s['accesses']}  TLB hit rate: {s['tlb_hit_rate']:.2%}  "
+              f"Page faults: {s['page_faults']} ({s['fault_rate']:.2%})")
+        print(f"Average walk depth: {s['avg_walk_depth']:.2f} of {self.levels} levels  "
+              f"Page tables allocated: {s['page_tables']}")
+        print(f"Effective access time: {s['eat_ns']:.1f} ns ({s['eat_no_faults_ns']:.1f} ns excluding page faults)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate address translation over a virtual address trace.")
+    parser.add_argument('trace', help="Trace file: 'va' or 'pid va' per line.")
+    parser.add_argument('--page-size', type=int, default=4096)
+    parser.add_argument('--levels', type=int, default=2, help="Page-table levels, 2 to 4 (default 2).")
+    parser.add_argument('--va-bits', type=int, default=32, help="Virtual address width (default 32).")
+    parser.add_argument('--tlb', default='16x4', help="TLB geometry SETSxWAYS (default 16x4).")
+    parser.add_argument('--tlb-policy', default='LRU', choices=TLB_POLICIES)
+    parser.add_argument('--frames', type=int, default=256, help="Physical frames (default 256).")
+    parser.add_argument('--algo', default='LRU', help=f"Page replacement: {', '.join(POLICIES)} (default LRU).")
+    parser.add_argument('--tlb-ns', type=float, default=1)
+    parser.add_argument('--memory-ns', type=float, default=100)
+    parser.add_argument('--fault-ns', type=float, default=8_000_000)
+    args = parser.parse_args()
+
+    try:
+        sets, ways = (int(x) for x in args.tlb.lower().split('x'))
+    except ValueError:
+        parser.error("--tlb must look like 16x4")
+    algo = args.algo.upper()
+    refs = None
+    if algo == 'OPT':
+        # OPT needs the page reference string, so translate the whole trace to pages first.
+        offset_bits = args.page_size.bit_length() - 1
+        refs = [(pid, va >> offset_bits) for pid, va in read_va_trace(args.trace)]
+    try:
+        memory = MemoryManager(args.frames, algo, refs)
+        mmu = MMU(memory, args.page_size, args.levels, args.va_bits, sets, ways, args.tlb_policy,
+                  args.tlb_ns, args.memory_ns, args.fault_ns)
+    except ValueError as e:
+        parser.error(str(e))
+    mmu.run(read_va_trace(args.trace))
+    mmu.print_stats()
+
+if __name__ == "__main__":
+    main()
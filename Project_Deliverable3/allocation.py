@@ -0,0 +1,288 @@
+# Per-process frame allocation, working sets and thrashing detection
+#
+# PerProcessMemoryManager is a MemoryManager that knows which process owns
+# each frame. With allocation='global' it replaces pages exactly like
+# MemoryManager (any process's page can be the victim). The local policies
+# give every process a frame quota and its own replacement-policy instance,
+# so a process that is at its quota can only evict its own pages:
+#   'equal'        - frames split evenly between the processes seen so far
+#   'proportional' - frames split in proportion to each process's virtual
+#                    size (highest page referenced + 1)
+#   'pff'          - page-fault frequency: every `pff_window` references a
+#                    process whose fault rate is above `pff_upper` gets
+#                    another frame (free, or from a process faulting less
+#                    than `pff_upper`) and one below `pff_lower` gives one back
+# A process under its quota takes a free frame if there is one, or else a
+# frame from the process that is furthest over its own quota. Quotas are
+# enforced lazily in this way, so they can change at any time.
+#
+# Each process also tracks its working set, the distinct pages among its last
+# `ws_window` references, and its fault rate over the same window.
+# thrashing_report() flags processes whose working set does not fit in
+# their frames while they fault heavily, and suggests frame counts.
+# rebalance() applies those counts.
+
+from collections import Counter, deque
+
+from replacement import make_policy
+from shell_mem_sync import MemoryManager, Page
+
+ALLOCATIONS = ('global', 'equal', 'proportional', 'pff')
+
+def split_frames(num_frames, weights):
+    # Frames in proportion to the weights, at least one each, the rounding
+    # remainder handed out from the front.
+    if len(weights) > num_frames:
+        raise ValueError(f"cannot give {len(weights)} processes at least one of {num_frames} frames each")
+    total = sum(weights)
+    quotas = [max(1, num_frames * w // total) for w in weights]
+    for i in range(num_frames - sum(quotas)):
+        quotas[i % len(quotas)] += 1
+    return quotas
+
+class ProcessState:
+    def __init__(self, pid, policy):
+        self.pid = pid
+        self.policy = policy  # replacement policy over this process's pages (local allocation)
+        self.quota = 0
+        self.resident = 0
+        self.size = 0  # highest page referenced + 1
+        self.references = 0
+        self.faults = 0
+        self.window = deque()  # (page, faulted) for the last ws_window references
+        self.window_pages = Counter()
+        self.window_faults = 0
+        self.pff_references = 0
+        self.pff_faults = 0
+
+    def working_set(self):
+        return len(self.window_pages)
+
+    def recent_fault_rate(self):
+        return self.window_faults / len(self.window) if self.window else 0.0
+
+class PerProcessMemoryManager(MemoryManager):
+    def __init__(self, num_frames, replacement_algo='FIFO', allocation='equal', reference_string=None,
+                 ws_window=100, pff_window=50, pff_lower=0.02, pff_upper=0.10, lock=None):
+        if allocation not in ALLOCATIONS:
+            raise ValueError(f"Unknown allocation policy {allocation!r} (choose from {', '.join(ALLOCATIONS)})")
+        super().__init__(num_frames, replacement_algo, reference_string, lock)
+        self.allocation = allocation
+        self.ws_window = ws_window
+        self.pff_window = pff_window
+        self.pff_lower = pff_lower
+        self.pff_upper = pff_upper
+        self.processes = {}  # pid -> ProcessState
+        # OPT under local allocation sees each process's own reference string.
+        self.per_process_refs = None
+        if reference_string is not None and allocation != 'global':
+            self.per_process_refs = {}
+            for key in reference_string:
+                self.per_process_refs.setdefault(key[0], []).append(key)
+
+    # ---- quotas ----
+
+    def _state(self, pid):
+        state = self.processes.get(pid)
+        if state is None:
+            if self.allocation == 'global':
+                state = self.processes[pid] = ProcessState(pid, None)
+                return state
+            if len(self.processes) >= self.num_frames:
+                raise ValueError(f"local allocation needs a frame per process: process {pid} would be "
+                                 f"number {len(self.processes) + 1} with {self.num_frames} frames")
+            state = self.processes[pid] = ProcessState(pid, None)
+            self._update_quotas()
+            # Size the policy by the frames the process actually gets.
+            refs = self.per_process_refs.get(pid, []) if self.per_process_refs is not None else None
+            state.policy = make_policy(self.replacement_algo, state.quota, refs)
+        return state
+
+    def _set_quota(self, state, quota):
+        state.quota = quota
+        resize = getattr(state.policy, 'resize', None)
+        if resize is not None:
+            resize(quota)
+
+    def _update_quotas(self):
+        # Split num_frames between the processes by weight, at least one each,
+        # and hand the rounding remainder out in pid order. PFF starts every
+        # process from an equal split and adjusts from there.
+        states = sorted(self.processes.values(), key=lambda p: p.pid)
+        if self.allocation == 'proportional':
+            weights = [max(p.size, 1) for p in states]
+        else:
+            weights = [1] * len(states)
+        for state, quota in zip(states, split_frames(self.num_frames, weights)):
+            self._set_quota(state, quota)
+
+    def _pff_adjust(self, state):
+        rate = state.pff_faults / state.pff_references
+        state.pff_references = state.pff_faults = 0
+        if rate > self.pff_upper:
+            spare = self.num_frames - sum(p.quota for p in self.processes.values())
+            if spare <= 0:
+                # Take a frame from the process with the lowest recent fault
+                # rate, but only if that process is itself below the upper
+                # bound. If every process is faulting too often, memory is
+                # overcommitted and thrashing_report() suggests a suspension.
+                donors = [p for p in self.processes.values() if p is not state and p.quota > 1]
+                if not donors:
+                    return
+                donor = min(donors, key=ProcessState.recent_fault_rate)
+                if donor.recent_fault_rate() > self.pff_upper:
+                    return
+                self._set_quota(donor, donor.quota - 1)
+            self._set_quota(state, state.quota + 1)
+        elif rate < self.pff_lower and state.quota > 1:
+            self._set_quota(state, state.quota - 1)
+
+    # ---- references ----
+
+    def _track(self, state, page_number, faulted):
+        # Sliding-window working set and fault rate.
+        state.references += 1
+        if faulted:
+            state.faults += 1
+        if page_number >= state.size:
+            state.size = page_number + 1
+            if self.allocation == 'proportional':
+                self._update_quotas()
+        if self.ws_window:
+            state.window.append((page_number, faulted))
+            state.window_pages[page_number] += 1
+            state.window_faults += faulted
+            if len(state.window) > self.ws_window:
+                old_page, old_fault = state.window.popleft()
+                state.window_faults -= old_fault
+                if state.window_pages[old_page] == 1:
+                    del state.window_pages[old_page]
+                else:
+                    state.window_pages[old_page] -= 1
+        if self.allocation == 'pff':
+            state.pff_references += 1
+            state.pff_faults += faulted
+            if state.pff_references >= self.pff_window:
+                self._pff_adjust(state)
+
+    def access(self, key):
+        pid = key[0]
+        state = self._state(pid)
+        if self.allocation == 'global':
+            result = super().access(key)
+            if result is not None:
+                state.resident += 1
+                if result[1] is not None:
+                    self.processes[result[1].process_id].resident -= 1
+            self._track(state, key[1], result is not None)
+            return result
+        self.clock += 1
+        t = state.references  # position in this process's own reference string
+        idx = self.page_table.get(key)
+        if idx is not None:
+            self.frames[idx].last_used = self.clock
+            state.policy.hit(key, t)
+            self._track(state, key[1], False)
+            return None
+        self.page_faults += 1
+        new_page = Page(pid, key[1], self.clock)
+        owner = self._victim_owner(state)
+        if owner is None:
+            old_page = None
+            self.page_table[key] = len(self.frames)
+            self.frames.append(new_page)
+        else:
+            victim = owner.policy.evict(key, owner.references)
+            idx = self.page_table.pop(victim)
+            old_page = self.frames[idx]
+            self.frames[idx] = new_page
+            self.page_table[key] = idx
+            owner.resident -= 1
+        state.policy.insert(key, t)
+        state.resident += 1
+        self._track(state, key[1], True)
+        return new_page, old_page
+
+    def _victim_owner(self, state):
+        # Whose page to replace on a fault by `state`, or None for a free frame.
+        if state.resident >= state.quota and state.resident > 0:
+            return state  # at quota: local replacement
+        if len(self.frames) < self.num_frames:
+            return None
+        over = max((p for p in self.processes.values() if p.resident > 0),
+                   key=lambda p: p.resident - p.quota)
+        if over.resident > over.quota or state.resident == 0:
+            return over
+        return state
+
+    def replay(self, references):
+        result = super().replay(references)
+        result['processes'] = self.process_report()
+        return result
+
+    # ---- reporting ----
+
+    def process_report(self):
+        return [{
+            'pid': p.pid,
+            'references': p.references,
+            'faults': p.faults,
+            'fault_rate': p.faults / p.references if p.references else 0.0,
+            'recent_fault_rate': p.recent_fault_rate(),
+            'working_set': p.working_set(),
+            'resident': p.resident,
+            'quota': p.quota if self.allocation != 'global' else None,
+        } for p in sorted(self.processes.values(), key=lambda p: p.pid)]
+
+    def thrashing_report(self, fault_threshold=0.3):
+        # A process is thrashing when it faults on more than `fault_threshold`
+        # of its recent references while its working set is bigger than the
+        # frames it holds. The suggestion gives each process frames in
+        # proportion to its working set. If the working sets add up to more
+        # than memory, the system as a whole is overcommitted, and the process
+        # with the largest working set is the one to suspend.
+        states = sorted(self.processes.values(), key=lambda p: p.pid)
+        thrashing = [p.pid for p in states
+                     if p.recent_fault_rate() > fault_threshold and p.working_set() > p.resident]
+        demand = sum(p.working_set() for p in states)
+        suggestion = {}
+        if states and len(states) <= self.num_frames:
+            weights = [max(p.working_set(), 1) for p in states]
+            suggestion = {p.pid: q for p, q in zip(states, split_frames(self.num_frames, weights))}
+        overcommitted = demand > self.num_frames
+        suspend = max(states, key=ProcessState.working_set).pid if overcommitted and thrashing else None
+        return {
+            'thrashing': thrashing,
+            'working_set_demand': demand,
+            'frames': self.num_frames,
+            'overcommitted': overcommitted,
+            'suggested_quotas': suggestion,
+            'suggest_suspend': suspend,
+        }
+
+    def rebalance(self, fault_threshold=0.3):
+        # Apply the suggested quotas (switching 'global' to 'equal'-style local
+        # replacement would need per-process policies, so global stays global).
+        report = self.thrashing_report(fault_threshold)
+        if self.allocation != 'global':
+            for pid, quota in report['suggested_quotas'].items():
+                self._set_quota(self.processes[pid], quota)
+        return report
+
+    def print_report(self, fault_threshold=0.3):
+        print(f"Allocation: {self.allocation}  Frames: {self.num_frames}  Working-set window: {self.ws_window}")
+        print("PID | Refs | Faults | Fault rate | Recent | WS size | Resident | Quota")
+        for r in self.process_report():
+            quota = '-' if r['quota'] is None else r['quota']
+            print(f"{r['pid']:3} | {r['references']:4} | {r['faults']:6} | {r['fault_rate']:10.2%} | "
+                  f"{r['recent_fault_rate']:6.2%} | {r['working_set']:7} | {r['resident']:8} | {quota:>5}")
+        report = self.thrashing_report(fault_threshold)
+        if report['thrashing']:
+            print(f"Thrashing: processes {', '.join(map(str, report['thrashing']))}")
+        else:
+            print("No thrashing detected.")
+        print(f"Working-set demand: {report['working_set_demand']} of {report['frames']} frames"
+              f"{' (overcommitted)' if report['overcommitted'] else ''}")
+        print("Suggested frames: " + ', '.join(f"P{pid}={q}" for pid, q in report['suggested_quotas'].items()))
+        if report['suggest_suspend'] is not None:
+            print(f"Suggest suspending process {report['suggest_suspend']} until memory frees up.")
@@ -0,0 +1,98 @@
+# asyncio producer-consumer
+#
+# ProducerConsumer gives every producer and consumer its own OS thread, so
+# modelling thousands of I/O-bound producers costs thousands of threads.
+# AsyncProducerConsumer runs them as tasks on one asyncio event loop (the
+# standard library loop; nothing like uvloop is needed) around a bounded
+# asyncio.Queue:
+#   - producers put up to `batch_size` items per wakeup and, if `io_delay`
+#     is set, await asyncio.sleep(io_delay) between batches to model waiting
+#     on I/O;
+#   - consumers take up to `batch_size` items per wakeup;
+#   - the queue stamps each item with the time it went in, so consumers
+#     measure its latency.
+# start(num_producers, num_consumers, duration) returns the same metrics as
+# ProducerConsumer in benchmark mode. Everything runs on one thread, so there
+# is no lock: "lock acquires" counts queue wakeups and the lock wait is zero.
+# Shutdown cancels the tasks; no semaphores need releasing.
+#
+#     python3 async_pc.py --producers 10000 --consumers 100 --buffer 1024 --io-delay 0.01
+
+import argparse
+import asyncio
+import time
+from array import array
+
+from shell_mem_sync import benchmark_summary, print_benchmark
+
+class TimestampQueue(asyncio.Queue):
+    # Stores the time each item actually enters the queue, after any wait for
+    # space, in place of the item (the same hook LifoQueue and PriorityQueue use).
+    def _put(self, item):
+        self._queue.append(time.perf_counter())
+
+class AsyncProducerConsumer:
+    def __init__(self, buffer_size=5, batch_size=1, io_delay=0.0):
+        self.buffer_size = buffer_size
+        self.batch_size = max(1, batch_size)
+        self.io_delay = io_delay
+        self.stats = None
+
+    async def producer(self, pid, queue):
+        batch, io_delay = self.batch_size, self.io_delay
+        while True:
+            await queue.put(pid)
+            self.produced += 1
+            self.wakeups += 1
+            n = 1
+            while n < batch and not queue.full():
+                queue.put_nowait(pid)
+                n += 1
+            self.produced += n - 1
+            if io_delay:
+                await asyncio.sleep(io_delay)
+
+    async def consumer(self, pid, queue):
+        batch, latencies = self.batch_size, self.latencies
+        clock = time.perf_counter
+        while True:
+            enqueued = [await queue.get()]
+            self.wakeups += 1
+            while len(enqueued) < batch and not queue.empty():
+                enqueued.append(queue.get_nowait())
+            now = clock()
+            latencies.extend(now - t for t in enqueued)
+
+    async def run(self, num_producers=1, num_consumers=1, duration=5):
+        queue = TimestampQueue(self.buffer_size)
+        self.produced = self.wakeups = 0
+        self.latencies = array('d')
+        began = time.perf_counter()
+        tasks = [asyncio.create_task(self.producer(i+1, queue)) for i in range(num_producers)]
+        tasks += [asyncio.create_task(self.consumer(i+1, queue)) for i in range(num_consumers)]
+        await asyncio.sleep(duration)
+        elapsed = time.perf_counter() - began
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.stats = benchmark_summary(self.produced, len(self.latencies), elapsed, self.latencies,
+                                       self.wakeups, 0.0)
+        return self.stats
+
+    def start(self, num_producers=1, num_consumers=1, duration=5):
+        return asyncio.run(self.run(num_producers, num_consumers, duration))
+
+def main():
+    parser = argparse.ArgumentParser(description="Producer-consumer on one asyncio event loop.")
+    parser.add_argument('--producers', type=int, default=1)
+    parser.add_argument('--consumers', type=int, default=1)
+    parser.add_argument('--buffer', type=int, default=256, help="Queue size (default 256).")
+    parser.add_argument('--batch', type=int, default=1, help="Items per wakeup (default 1).")
+    parser.add_argument('--io-delay', type=float, default=0.0, help="Seconds each producer waits between batches.")
+    parser.add_argument('--duration', type=float, default=2, help="Seconds per run (default 2).")
+    args = parser.parse_args()
+    pc = AsyncProducerConsumer(args.buffer, args.batch, args.io_delay)
+    print_benchmark(pc.start(args.producers, args.consumers, args.duration))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# Bulk page reference traces and LRU miss-ratio curves
+#
+# A trace file has one reference per line: "pid page" (or "pid,page"), or
+# just "page" for process 1. Blank lines and lines starting with '#' are
+# skipped. Traces are read lazily, so files larger than memory can be replayed.
+#
+# Command line:
+#     python3 paging_trace.py trace.txt --frames 64,256 --algo LRU,CLOCK,ARC
+#     python3 paging_trace.py trace.txt --mrc            # LRU faults for every frame count
+#
+# The miss-ratio curve uses Mattson's stack algorithm: under LRU a reference
+# hits with c frames exactly when its stack distance (the number of distinct
+# pages referenced since the previous reference to the same page, plus one)
+# is at most c. One pass that counts stack distances therefore gives the
+# LRU fault count for every memory size at once. The distinct pages are
+# counted with a Fenwick tree over reference positions, in O(log n) each.
+# Only the latest position of each page matters, so positions are renumbered
+# whenever the tree fills up: memory stays O(distinct pages), not O(references).
+
+import argparse
+import itertools
+
+from replacement import POLICIES
+from shell_mem_sync import MemoryManager
+
+def read_trace(path):
+    # Yield (process_id, page_number) pairs from a trace file.
+    with open(path) as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            fields = line.replace(',', ' ').split()
+            try:
+                if len(fields) == 1:
+                    yield 1, int(fields[0])
+                elif len(fields) == 2:
+                    yield int(fields[0]), int(fields[1])
+                else:
+                    raise ValueError("expected 'pid page' or 'page'")
+            except ValueError as e:
+                raise ValueError(f"{path}:{lineno}: bad reference {line!r} ({e})") from None
+
+class Fenwick:
+    # Binary indexed tree of counts over positions 0..size-1.
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, pos, delta):
+        tree = self.tree
+        pos += 1
+        while pos <= self.size:
+            tree[pos] += delta
+            pos += pos & -pos
+
+    def prefix(self, pos):
+        # Sum of positions 0..pos-1.
+        tree = self.tree
+        total = 0
+        while pos > 0:
+            total += tree[pos]
+            pos -= pos & -pos
+        return total
+
+def stack_distances(references):
+    # One pass over the references. Returns (histogram, cold, count): histogram[d]
+    # is the number of references with stack distance d (d >= 1), cold the
+    # number of first references (infinite distance), count the total.
+    last = {}  # page -> position of its latest reference
+    tree = Fenwick(1 << 16)  # 1 at the latest position of every page seen
+    histogram = [0]
+    cold = 0
+    count = 0
+    t = 0  # next position
+    for key in references:
+        count += 1
+        if t >= tree.size:
+            # Out of positions: renumber the live pages 0..n-1 in order and
+            # leave at least as many free positions as there are pages.
+            order = sorted(last, key=last.__getitem__)
+            live = len(order)
+            tree = Fenwick(max(1 << 16, 2 * live))
+            # Node i covers positions (i - lowbit(i), i]; count the live ones.
+            tree.tree = [0] + [max(0, min(i, live) - (i - (i & -i))) for i in range(1, tree.size + 1)]
+            for pos, page in enumerate(order):
+                last[page] = pos
+            t = live
+        prev = last.get(key)
+        if prev is None:
+            cold += 1
+        else:
+            # Distinct pages referenced after prev, plus this page itself.
+            distance = len(last) - tree.prefix(prev + 1) + 1
+            if distance >= len(histogram):
+                histogram.extend([0] * (distance + 1 - len(histogram)))
+            histogram[distance] += 1
+            tree.add(prev, -1)
+        tree.add(t, 1)
+        last[key] = t
+        t += 1
+    return histogram, cold, count
+
+def lru_fault_curve(references):
+    # faults[c] = LRU page faults with c frames, for c = 0 .. number of
+    # distinct pages (more frames than that only leave the cold misses).
+    histogram, cold, count = stack_distances(references)
+    distinct = cold
+    faults = [count] * (distinct + 1)
+    hits = 0
+    for c in range(1, distinct + 1):
+        if c < len(histogram):
+            hits += histogram[c]
+        faults[c] = count - hits
+    return faults
+
+def print_curve(faults, points=20):
+    count = faults[0]
+    print("Frames | Faults | Miss ratio")
+    last = len(faults) - 1
+    step = max(1, last // points)
+    sizes = sorted(set(list(range(1, last + 1, step)) + [last])) if last else []
+    for c in sizes:
+        ratio = faults[c] / count if count else 0.0
+        print(f"{c:6} | {faults[c]:6} | {ratio:9.2%}")
+
+def parse_list(text, cast=str):
+    return [cast(item) for item in text.split(',') if item]
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a page reference trace.")
+    parser.add_argument('trace', help="Trace file: 'pid page' or 'page' per line.")
+    parser.add_argument('--frames', default='4,16,64', help="Comma-separated frame counts (default 4,16,64).")
+    parser.add_argument('--algo', default='FIFO,LRU', help=f"Comma-separated policies: {', '.join(POLICIES)}.")
+    parser.add_argument('--mrc', action='store_true', help="Print the LRU miss-ratio curve instead.")
+    parser.add_argument('--points', type=int, default=20, help="Rows of the curve to print (default 20).")
+    args = parser.parse_args()
+
+    if args.mrc:
+        print_curve(lru_fault_curve(read_trace(args.trace)), args.points)
+        return
+    algos = [a.upper() for a in parse_list(args.algo)]
+    for algo in algos:
+        if algo not in POLICIES:
+            parser.error(f"unknown algorithm {algo}")
+    reference_string = list(read_trace(args.trace)) if 'OPT' in algos else None
+    print("Algorithm | Frames | References |   Faults | Fault rate")
+    for algo, frames in itertools.product(algos, parse_list(args.frames, int)):
+        mm = MemoryManager(frames, algo, reference_string)
+        result = mm.replay(reference_string if reference_string is not None else read_trace(args.trace))
+        print(f"{algo:9} | {frames:6} | {result['references']:10} | {result['faults']:8} | "
+              f"{result['fault_rate']:9.2%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# Producer-consumer benchmark sweeps
+#
+# Runs a producer-consumer engine for every combination of producer count,
+# consumer count, buffer size and batch size, and prints throughput, latency
+# and lock-wait time for each. The engines are 'threads' (ProducerConsumer in
+# benchmark mode), 'shm' (SharedRingProducerConsumer, one process each) and
+# 'async' (AsyncProducerConsumer, tasks on one event loop):
+#     python3 pc_benchmark.py --producers 1,2,4 --consumers 1,2,4 --buffers 16,256 --batch 1,32 --duration 2
+#     python3 pc_benchmark.py --engine threads,shm --producers 2 --consumers 1,2,4
+#     python3 pc_benchmark.py --engine threads,async --producers 10,1000 --consumers 10
+
+import argparse
+import itertools
+
+from async_pc import AsyncProducerConsumer
+from shell_mem_sync import ProducerConsumer
+from shm_ring import SharedRingProducerConsumer
+
+ENGINES = {
+    'threads': lambda size, batch: ProducerConsumer(size, benchmark=True, batch_size=batch),
+    'shm': SharedRingProducerConsumer,
+    'async': AsyncProducerConsumer,
+}
+
+def run(num_producers, num_consumers, buffer_size, batch_size=1, duration=2, engine='threads'):
+    pc = ENGINES[engine](buffer_size, batch_size)
+    return pc.start(num_producers, num_consumers, duration)
+
+def sweep(producers, consumers, buffers, batches, duration=2, engines=('threads',)):
+    # Yields ((engine, producers, consumers, buffer size, batch size), stats) pairs.
+    for engine, p, c, size, batch in itertools.product(engines, producers, consumers, buffers, batches):
+        yield (engine, p, c, size, batch), run(p, c, size, batch, duration, engine)
+
+def print_sweep(results):
+    print("Engine  | Prod | Cons | Buffer | Batch |    Items/s | p50 us | p99 us | Lock wait s | Wait/acq us")
+    for (engine, p, c, size, batch), s in results:
+        print(f"{engine:7} | {p:4} | {c:4} | {size:6} | {batch:5} | {s['items_per_sec']:10,.0f} | "
+              f"{s['latency_p50'] * 1e6:6.1f} | {s['latency_p99'] * 1e6:6.1f} | "
+              f"{s['lock_wait']:11.3f} | {s['lock_wait_mean'] * 1e6:11.2f}")
+
+def parse_list(text):
+    return [int(item) for item in text.split(',') if item]
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the producer-consumer buffer.")
+    parser.add_argument('--producers', default='1,2,4', help="Comma-separated producer counts (default 1,2,4).")
+    parser.add_argument('--consumers', default='1,2,4', help="Comma-separated consumer counts (default 1,2,4).")
+    parser.add_argument('--buffers', default='16,256', help="Comma-separated buffer sizes (default 16,256).")
+    parser.add_argument('--batch', default='1', help="Comma-separated items per lock acquisition (default 1).")
+    parser.add_argument('--duration', type=float, default=2, help="Seconds per run (default 2).")
+    parser.add_argument('--engine', default='threads', help=f"Comma-separated engines: {', '.join(ENGINES)} "
+                                                              f"(default threads).")
+    args = parser.parse_args()
+    engines = [e for e in args.engine.split(',') if e]
+    for engine in engines:
+        if engine not in ENGINES:
+            parser.error(f"unknown engine {engine}")
+    print_sweep(sweep(parse_list(args.producers), parse_list(args.consumers), parse_list(args.buffers),
+                      parse_list(args.batch), args.duration, engines))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+# Page replacement policies for MemoryManager
+#
+# Each policy tracks the resident pages by key (process_id, page_number) and
+# is told about every reference through three calls:
+#   hit(key, t)    - a resident page was referenced
+#   evict(key, t)  - memory is full and `key` must be loaded: choose, forget
+#                    and return the key of the page to replace
+#   insert(key, t) - `key` was loaded into a frame
+# where t is the 0-based position of the reference in the reference string.
+# A policy that sizes itself from num_frames (ARC) also has
+#   resize(num_frames) - the frames it manages changed (local allocation)
+# All operations are O(1) except OPT's, which are O(log n).
+
+import heapq
+from array import array
+from collections import deque, OrderedDict
+
+class FIFOPolicy:
+    # Evict the page that was loaded first.
+    def __init__(self, num_frames):
+        self.queue = deque()
+
+    def hit(self, key, t):
+        pass
+
+    def evict(self, key, t):
+        return self.queue.popleft()
+
+    def insert(self, key, t):
+        self.queue.append(key)
+
+class LRUPolicy:
+    # Evict the least recently used page. The OrderedDict runs from least to
+    # most recently used.
+    def __init__(self, num_frames):
+        self.order = OrderedDict()
+
+    def hit(self, key, t):
+        self.order.move_to_end(key)
+
+    def evict(self, key, t):
+        return self.order.popitem(last=False)[0]
+
+    def insert(self, key, t):
+        self.order[key] = None
+
+class OPTPolicy:
+    # Belady's optimal policy: evict the page whose next reference is furthest
+    # in the future. It needs the whole reference string up front. One backward
+    # pass builds next_use[t] (the position of the next reference to the same
+    # page as reference t, or len(refs) for never). Resident pages sit in a
+    # max-heap keyed by their next use. A page's entry goes stale when it is
+    # referenced again, so stale entries are skipped at eviction (lazy deletion).
+    def __init__(self, num_frames, reference_string):
+        self.refs = list(reference_string)
+        never = len(self.refs)
+        self.next_use = array('q', [never]) * never
+        last_seen = {}
+        for t in range(never - 1, -1, -1):
+            key = self.refs[t]
+            self.next_use[t] = last_seen.get(key, never)
+            last_seen[key] = t
+        self.heap = []  # (-next use, key)
+        self.resident = {}  # key -> its current next use
+
+    def _touch(self, key, t):
+        if t >= len(self.refs) or self.refs[t] != key:
+            raise ValueError(f"OPT: reference {t} is {key}, not the one in the precomputed reference string")
+        next_use = self.next_use[t]
+        self.resident[key] = next_use
+        heapq.heappush(self.heap, (-next_use, key))
+        if len(self.heap) > 2 * len(self.resident) + 64:
+            # Drop stale entries so the heap stays O(frames).
+            self.heap = [(-n, k) for k, n in self.resident.items()]
+            heapq.heapify(self.heap)
+
+    def hit(self, key, t):
+        self._touch(key, t)
+
+    def evict(self, key, t):
+        heap = self.heap
+        while True:
+            neg_next, victim = heapq.heappop(heap)
+            if self.resident.get(victim) == -neg_next:
+                del self.resident[victim]
+                return victim
+
+    def insert(self, key, t):
+        self._touch(key, t)
+
+class ClockPolicy:
+    # Second chance: frames form a circle with one reference bit each. The
+    # hand skips (and clears) pages whose bit is set and evicts the first
+    # page whose bit is clear.
+    def __init__(self, num_frames):
+        self.slots = []  # key in each clock position, None once evicted
+        self.ref_bits = bytearray()
+        self.slot_of = {}  # key -> clock position
+        self.hand = 0
+        self.free_slots = []  # positions emptied by evictions, reused by inserts
+
+    def hit(self, key, t):
+        self.ref_bits[self.slot_of[key]] = 1
+
+    def evict(self, key, t):
+        slots, bits = self.slots, self.ref_bits
+        while slots[self.hand] is None or bits[self.hand]:
+            bits[self.hand] = 0
+            self.hand = (self.hand + 1) % len(slots)
+        victim = slots[self.hand]
+        del self.slot_of[victim]
+        slots[self.hand] = None
+        self.free_slots.append(self.hand)
+        self.hand = (self.hand + 1) % len(slots)
+        return victim
+
+    def insert(self, key, t):
+        # A new page starts with its bit clear, as in the textbook algorithm.
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.slots[slot] = key
+            self.ref_bits[slot] = 0
+        else:
+            slot = len(self.slots)
+            self.slots.append(key)
+            self.ref_bits.append(0)
+        self.slot_of[key] = slot
+
+class LFUPolicy:
+    # Evict the least frequently used page, the least recently used one among
+    # ties. Pages are kept in one bucket per use count (an OrderedDict in
+    # recency order) and min_count names the lowest non-empty bucket, so
+    # every operation is O(1).
+    def __init__(self, num_frames):
+        self.count = {}    # key -> number of references while resident
+        self.buckets = {}  # count -> OrderedDict of keys
+        self.min_count = 0
+
+    def hit(self, key, t):
+        count = self.count[key]
+        bucket = self.buckets[count]
+        del bucket[key]
+        if not bucket:
+            del self.buckets[count]
+            if self.min_count == count:
+                self.min_count = count + 1
+        self.count[key] = count + 1
+        self.buckets.setdefault(count + 1, OrderedDict())[key] = None
+
+    def evict(self, key, t):
+        if self.min_count not in self.buckets:
+            # Only after several evictions in a row (local frame allocation).
+            self.min_count = min(self.buckets)
+        bucket = self.buckets[self.min_count]
+        victim, _ = bucket.popitem(last=False)
+        if not bucket:
+            del self.buckets[self.min_count]
+        del self.count[victim]
+        return victim
+
+    def insert(self, key, t):
+        self.count[key] = 1
+        self.buckets.setdefault(1, OrderedDict())[key] = None
+        self.min_count = 1
+
+class ARCPolicy:
+    # Adaptive Replacement Cache (Megiddo & Modha). T1 holds pages seen once
+    # recently, T2 pages seen at least twice. B1 and B2 remember the keys
+    # recently evicted from T1 and T2. A miss that hits B1 means T1 was too
+    # small, so the target size p of T1 grows. A miss that hits B2 shrinks p.
+    # All four lists are OrderedDicts, LRU first.
+    def __init__(self, num_frames):
+        self.c = num_frames
+        self.p = 0.0
+        self.t1 = OrderedDict()
+        self.t2 = OrderedDict()
+        self.b1 = OrderedDict()
+        self.b2 = OrderedDict()
+
+    def hit(self, key, t):
+        if key in self.t1:
+            del self.t1[key]
+        else:
+            del self.t2[key]
+        self.t2[key] = None
+
+    def _replace(self, key):
+        # Evict from T1 if it is over its target size (or T2 is empty), else from T2.
+        if self.t1 and (len(self.t1) > self.p or (key in self.b2 and len(self.t1) == self.p)
+                        or not self.t2):
+            victim, _ = self.t1.popitem(last=False)
+            self.b1[victim] = None
+        else:
+            victim, _ = self.t2.popitem(last=False)
+            self.b2[victim] = None
+        return victim
+
+    def evict(self, key, t):
+        c = self.c
+        if key in self.b1:
+            self.p = min(c, self.p + max(len(self.b2) / len(self.b1), 1))
+            return self._replace(key)
+        if key in self.b2:
+            self.p = max(0, self.p - max(len(self.b1) / len(self.b2), 1))
+            return self._replace(key)
+        # A page not seen recently: keep the ghost lists within 2c keys in total.
+        if len(self.t1) + len(self.b1) == c:
+            if len(self.t1) < c:
+                self.b1.popitem(last=False)
+                return self._replace(key)
+            victim, _ = self.t1.popitem(last=False)  # T1 fills memory: evict without a ghost
+            return victim
+        if len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2) >= 2 * c:
+            (self.b2 or self.b1).popitem(last=False)
+        return self._replace(key)
+
+    def resize(self, num_frames):
+        # Move the target and trim the ghost lists to the new size. Pages
+        # beyond it stay resident until evict() picks them as usual.
+        c = self.c = num_frames
+        self.p = min(self.p, c)
+        while len(self.t1) + len(self.b1) > c and self.b1:
+            self.b1.popitem(last=False)
+        while len(self.t1) + len(self.t2) + len(self.b1) + len(self.b2) > 2 * c and (self.b1 or self.b2):
+            (self.b2 or self.b1).popitem(last=False)
+
+    def insert(self, key, t):
+        if key in self.b1:
+            del self.b1[key]
+            self.t2[key] = None
+        elif key in self.b2:
+            del self.b2[key]
+            self.t2[key] = None
+        else:
+            self.t1[key] = None
+
+POLICIES = {
+    'FIFO': FIFOPolicy,
+    'LRU': LRUPolicy,
+    'OPT': OPTPolicy,
+    'CLOCK': ClockPolicy,
+    'LFU': LFUPolicy,
+    'ARC': ARCPolicy,
+}
+
+def make_policy(name, num_frames, reference_string=None):
+    if name not in POLICIES:
+        raise ValueError(f"Unknown replacement algorithm {name!r} (choose from {', '.join(POLICIES)})")
+    if name == 'OPT':
+        if reference_string is None:
+            raise ValueError("OPT needs the reference string in advance")
+        return OPTPolicy(num_frames, reference_string)
+    return POLICIES[name](num_frames)
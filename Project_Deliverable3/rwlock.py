@@ -0,0 +1,295 @@
+# Readers-writer locks and lock-contention instrumentation
+#
+# RWLock lets any number of readers hold the lock together, or one writer
+# alone. The policy decides who goes first when both are waiting:
+#   'reader' - readers enter whenever no writer holds the lock (writers can starve)
+#   'writer' - readers also wait while a writer is waiting (readers can starve)
+#   'fair'   - threads enter in arrival order; consecutive readers enter together
+# rw.reader and rw.writer behave like ordinary locks (acquire/release, `with`).
+#
+# InstrumentedLock wraps any lock, including rw.reader and rw.writer. It
+# counts acquisitions, contended acquisitions (ones that had to wait), hold
+# times, and a histogram of wait times in power-of-two microsecond buckets.
+# It works as the buffer lock of ProducerConsumer and as the lock of
+# MemoryManager:
+#     lock = InstrumentedLock(name='buffer')
+#     ProducerConsumer(64, benchmark=True, lock=lock).start(4, 4, 2)
+#     lock.print_stats()
+#
+# Command line: threads reading and updating one MemoryManager, behind a
+# plain mutex or an RWLock of each policy, with the contention stats of each:
+#     python3 rwlock.py --readers 8 --writers 2 --duration 2
+
+import argparse
+import itertools
+import random
+import threading
+import time
+from collections import deque
+
+RW_POLICIES = ('reader', 'writer', 'fair')
+
+class RWLock:
+    def __init__(self, policy='fair'):
+        if policy not in RW_POLICIES:
+            raise ValueError(f"Unknown readers-writer policy {policy!r} (choose from {', '.join(RW_POLICIES)})")
+        self.policy = policy
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+        self._tickets = itertools.count()
+        self._queue = deque()  # tickets of waiting threads, 'fair' only
+        self.reader = _RWSide(self.acquire_read, self.release_read)
+        self.writer = _RWSide(self.acquire_write, self.release_write)
+
+    def _wait(self, ready, blocking, timeout):
+        # Wait on the condition (held by the caller) until ready() is true.
+        if self.policy == 'fair':
+            if not self._queue and ready():
+                return True
+            if not blocking:
+                return False
+            ticket = next(self._tickets)
+            self._queue.append(ticket)
+            def turn():
+                return self._queue[0] == ticket and ready()
+            try:
+                return self._cond.wait_for(turn, _wait_timeout(blocking, timeout))
+            finally:
+                # Also on an exception (KeyboardInterrupt in wait_for, a bad
+                # timeout): a stranded ticket would block everyone behind it.
+                first = self._queue[0] == ticket
+                self._queue.remove(ticket)
+                if first and self._queue:
+                    # The next thread in line may be able to enter too (another
+                    # reader), or was waiting behind a thread that gave up.
+                    self._cond.notify_all()
+        return self._cond.wait_for(ready, _wait_timeout(blocking, timeout))
+
+    def acquire_read(self, blocking=True, timeout=-1):
+        # A non-blocking acquire must not wait even for the internal lock.
+        if not self._cond.acquire(blocking):
+            return False
+        try:
+            if self.policy == 'writer':
+                ready = lambda: not self._writer and not self._writers_waiting
+            else:
+                ready = lambda: not self._writer
+            if not self._wait(ready, blocking, timeout):
+                return False
+            self._readers += 1
+            return True
+        finally:
+            self._cond.release()
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if not self._readers:
+                self._cond.notify_all()
+
+    def acquire_write(self, blocking=True, timeout=-1):
+        if not self._cond.acquire(blocking):
+            return False
+        try:
+            self._writers_waiting += 1
+            ok = False
+            try:
+                ok = self._wait(lambda: not self._writer and not self._readers, blocking, timeout)
+            finally:
+                self._writers_waiting -= 1
+                if ok:
+                    self._writer = True
+                elif self.policy == 'writer':
+                    self._cond.notify_all()  # readers held back by this writer may go
+            return ok
+        finally:
+            self._cond.release()
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+def _wait_timeout(blocking, timeout):
+    if not blocking:
+        return 0
+    return None if timeout < 0 else timeout
+
+class _RWSide:
+    # One side (read or write) of an RWLock with the usual lock interface.
+    def __init__(self, acquire, release):
+        self.acquire = acquire
+        self.release = release
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class InstrumentedLock:
+    BUCKETS = 24  # wait-time buckets: < 1 us, < 2 us, < 4 us, ... and the rest
+
+    def __init__(self, lock=None, name='lock'):
+        self.lock = lock if lock is not None else threading.Lock()
+        self.name = name
+        self._stats_lock = threading.Lock()  # readers of an RWLock update the stats together
+        self._local = threading.local()  # acquire times of the locks this thread holds
+        self.reset()
+
+    def reset(self):
+        with self._stats_lock:
+            self.acquires = 0
+            self.contended = 0
+            self.wait_total = 0.0
+            self.wait_max = 0.0
+            self.hold_total = 0.0
+            self.hold_max = 0.0
+            self.wait_histogram = [0] * self.BUCKETS
+
+    def acquire(self, blocking=True, timeout=-1):
+        clock = time.perf_counter
+        requested = clock()
+        if self.lock.acquire(False):
+            contended = False
+        elif not blocking or not self.lock.acquire(True, timeout):
+            return False
+        else:
+            contended = True
+        acquired = clock()
+        wait = acquired - requested
+        bucket = min(int(wait * 1e6).bit_length(), self.BUCKETS - 1)
+        with self._stats_lock:
+            self.acquires += 1
+            self.contended += contended
+            self.wait_total += wait
+            if wait > self.wait_max:
+                self.wait_max = wait
+            self.wait_histogram[bucket] += 1
+        held = getattr(self._local, 'held', None)
+        if held is None:
+            held = self._local.held = []
+        held.append(acquired)
+        return True
+
+    def release(self):
+        held = getattr(self._local, 'held', None)
+        # A plain Lock may be released by another thread; then the hold time is unknown.
+        hold = time.perf_counter() - held.pop() if held else None
+        self.lock.release()
+        if hold is not None:
+            with self._stats_lock:
+                self.hold_total += hold
+                if hold > self.hold_max:
+                    self.hold_max = hold
+
+    def _is_owned(self):
+        # Used by threading.Condition, so it does not probe with acquire(False).
+        return bool(getattr(self._local, 'held', None))
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def stats(self):
+        n = self.acquires
+        return {
+            'name': self.name,
+            'acquires': n,
+            'contended': self.contended,
+            'contention_rate': self.contended / n if n else 0.0,
+            'wait_total': self.wait_total,
+            'wait_mean': self.wait_total / n if n else 0.0,
+            'wait_max': self.wait_max,
+            'hold_total': self.hold_total,
+            'hold_mean': self.hold_total / n if n else 0.0,
+            'hold_max': self.hold_max,
+            'wait_histogram': list(self.wait_histogram),
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"Lock {s['name']}: {s['acquires']} acquires, {s['contended']} contended ({s['contention_rate']:.1%})")
+        print(f"  Wait: total {s['wait_total']:.3f} s, mean {s['wait_mean'] * 1e6:.2f} us, "
+              f"max {s['wait_max'] * 1e6:.1f} us")
+        print(f"  Hold: total {s['hold_total']:.3f} s, mean {s['hold_mean'] * 1e6:.2f} us, "
+              f"max {s['hold_max'] * 1e6:.1f} us")
+        print("  Wait histogram:")
+        low = 0
+        for i, count in enumerate(s['wait_histogram']):
+            high = 1 << i
+            if count:
+                bound = f"< {high} us" if i < self.BUCKETS - 1 else f">= {low} us"
+                print(f"    {bound:>12}: {count}")
+            low = high
+
+class InstrumentedRWLock:
+    # An RWLock whose read and write sides are each instrumented.
+    def __init__(self, policy='fair', name='rwlock'):
+        self.rwlock = RWLock(policy)
+        self.reader = InstrumentedLock(self.rwlock.reader, f"{name} (read)")
+        self.writer = InstrumentedLock(self.rwlock.writer, f"{name} (write)")
+
+    def print_stats(self):
+        self.reader.print_stats()
+        self.writer.print_stats()
+
+# ---------------------- Contention benchmark ----------------------
+
+def contention_run(lock, readers=8, writers=2, duration=2, num_frames=64, pages=256, seed=0):
+    # Reader threads check whether random pages are resident and look at the
+    # frames; writer threads reference pages. Returns (reads, writes) done.
+    from shell_mem_sync import MemoryManager
+    mm = MemoryManager(num_frames, 'LRU', lock=lock)
+    running = True
+    counts = [0] * (readers + writers)
+
+    def reader(i):
+        rng = random.Random(seed + i)
+        while running:
+            mm.is_resident(1, rng.randrange(pages))
+            mm.snapshot()
+            counts[i] += 1
+
+    def writer(i):
+        rng = random.Random(seed + i)
+        while running:
+            with mm.write_lock:
+                mm.access((1, rng.randrange(pages)))
+            counts[i] += 1
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    threads += [threading.Thread(target=writer, args=(readers + i,)) for i in range(writers)]
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    running = False
+    for t in threads:
+        t.join()
+    return sum(counts[:readers]), sum(counts[readers:])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare a mutex with readers-writer locks on a MemoryManager.")
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=2, help="Seconds per lock (default 2).")
+    parser.add_argument('--frames', type=int, default=64)
+    args = parser.parse_args()
+    for policy in ('mutex',) + RW_POLICIES:
+        if policy == 'mutex':
+            lock = InstrumentedLock(name='mutex')
+        else:
+            lock = InstrumentedRWLock(policy, name=f"rwlock {policy}")
+        reads, writes = contention_run(lock, args.readers, args.writers, args.duration, args.frames)
+        print(f"== {policy}: {reads / args.duration:,.0f} reads/s, {writes / args.duration:,.0f} writes/s")
+        lock.print_stats()
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -1,82 +1,181 @@
 import threading
 import time
 import random
+from array import array
 from collections import deque
+from contextlib import nullcontext
+
+from replacement import POLICIES, make_policy
 
 # ---------------------- Memory Management (Paging) ----------------------
 
 class Page:
-    def __init__(self, process_id, page_number):
+    def __init__(self, process_id, page_number, last_used=0):
         self.process_id = process_id
         self.page_number = page_number
-        self.last_used = time.time()
+        self.last_used = last_used  # logical time of the last reference
 
     def __repr__(self):
         return f"P{self.process_id}:Pg{self.page_number}"
 
 class MemoryManager:
-    def __init__(self, num_frames, replacement_algo='FIFO'):
+    # page_table maps (process_id, page_number) -> frame index, so a hit is one
+    # dict lookup instead of a scan of self.frames. The victim on a fault is
+    # chosen by a policy object from replacement.py: FIFO, LRU, OPT, CLOCK,
+    # LFU or ARC. OPT needs the whole reference string in advance, as a list
+    # of (process_id, page_number) pairs in the order they will be requested.
+    # Recency is a logical reference counter, so there are never ties.
+    # `lock` makes request_page, is_resident, snapshot and show_memory safe to
+    # call from several threads. It can be any lock, or an RWLock from
+    # rwlock.py (or anything else with .reader and .writer sides), in which
+    # case the read-only calls share the read side. replay() and access()
+    # never lock.
+    def __init__(self, num_frames, replacement_algo='FIFO', reference_string=None, lock=None):
         self.num_frames = num_frames
         self.frames = []  # List of Page objects
         self.page_faults = 0
         self.replacement_algo = replacement_algo
-        self.fifo_queue = deque()
-        self.lru_dict = {}
+        self.reference_string = reference_string
+        self.policy = make_policy(replacement_algo, num_frames, reference_string)
+        self.page_table = {}  # (pid, page) -> index in self.frames
+        self.clock = 0  # number of references so far
+        if lock is None:
+            self.read_lock = self.write_lock = nullcontext()
+        elif hasattr(lock, 'writer'):
+            self.read_lock, self.write_lock = lock.reader, lock.writer
+        else:
+            self.read_lock = self.write_lock = lock
 
     def request_page(self, process_id, page_number):
+        with self.write_lock:
+            result = self.access((process_id, page_number))
+            if result is None:
+                page = self.frames[self.page_table[(process_id, page_number)]]
+        if result is None:
+            print(f"Page {page} already in memory.")
+            return False  # No page fault
+        new_page, old_page = result
+        print(f"Page fault: loading {process_id}:{page_number}")
+        if old_page is not None:
+            print(f"[{self.replacement_algo}] Replacing {old_page} with {new_page}")
+        return True  # Page fault occurred
+
+    def access(self, key):
+        # One reference to key = (process_id, page_number), without output.
+        # Returns None on a hit, else (loaded page, page it replaced or None).
+        self.clock += 1
         # Check if page is already in memory
-        for page in self.frames:
-            if page.process_id == process_id and page.page_number == page_number:
-                if self.replacement_algo == 'LRU':
-                    page.last_used = time.time()
-                print(f"Page {page} already in memory.")
-                return False  # No page fault
+        idx = self.page_table.get(key)
+        if idx is not None:
+            self.frames[idx].last_used = self.clock
+            self.policy.hit(key, self.clock - 1)
+            return None
         # Page fault
         self.page_faults += 1
-        print(f"Page fault: loading {process_id}:{page_number}")
-        new_page = Page(process_id, page_number)
+        new_page = Page(key[0], key[1], self.clock)
         if len(self.frames) < self.num_frames:
+            self.page_table[key] = len(self.frames)
             self.frames.append(new_page)
-            if self.replacement_algo == 'FIFO':
-                self.fifo_queue.append(new_page)
-        else:
-            self.replace_page(new_page)
-        return True  # Page fault occurred
+            self.policy.insert(key, self.clock - 1)
+            return new_page, None
+        return new_page, self.replace_page(new_page)
 
     def replace_page(self, new_page):
-        if self.replacement_algo == 'FIFO':
-            old_page = self.fifo_queue.popleft()
-            idx = self.frames.index(old_page)
-            print(f"[FIFO] Replacing {old_page} with {new_page}")
-            self.frames[idx] = new_page
-            self.fifo_queue.append(new_page)
-        elif self.replacement_algo == 'LRU':
-            # Find least recently used
-            lru_page = min(self.frames, key=lambda p: p.last_used)
-            idx = self.frames.index(lru_page)
-            print(f"[LRU] Replacing {lru_page} with {new_page}")
-            self.frames[idx] = new_page
-        else:
-            raise ValueError("Unknown replacement algorithm")
+        # Evict the policy's victim, load new_page into its frame and return the victim.
+        key = (new_page.process_id, new_page.page_number)
+        victim = self.policy.evict(key, self.clock - 1)
+        idx = self.page_table.pop(victim)
+        old_page = self.frames[idx]
+        self.frames[idx] = new_page
+        self.page_table[key] = idx
+        self.policy.insert(key, self.clock - 1)
+        return old_page
+
+    def replay(self, references):
+        # Quiet bulk mode: run an iterable of (process_id, page_number) pairs
+        # through the manager in a tight loop and return the counts.
+        access = self.access
+        faults_before = self.page_faults
+        count = 0
+        for key in references:
+            access(key)
+            count += 1
+        faults = self.page_faults - faults_before
+        return {'references': count, 'faults': faults, 'hits': count - faults,
+                'fault_rate': faults / count if count else 0.0}
+
+    def is_resident(self, process_id, page_number):
+        with self.read_lock:
+            return (process_id, page_number) in self.page_table
+
+    def snapshot(self):
+        # A copy of the frames list, safe to look at while other threads run.
+        with self.read_lock:
+            return list(self.frames)
 
     def show_memory(self):
-        print(f"Current memory frames: {self.frames}")
+        print(f"Current memory frames: {self.snapshot()}")
 
     def reset(self):
         self.frames = []
         self.page_faults = 0
-        self.fifo_queue = deque()
+        self.policy = make_policy(self.replacement_algo, self.num_frames, self.reference_string)
+        self.page_table = {}
+        self.clock = 0
 
 # ---------------------- Process Synchronization (Producer-Consumer) ----------------------
 
+def percentile(sorted_values, q):
+    # Linear interpolation between closest ranks.
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (pos - low)
+
+def benchmark_summary(produced, consumed, elapsed, latencies, acquires, lock_wait):
+    # Throughput, enqueue-to-dequeue latency (seconds) and time spent waiting
+    # to acquire the buffer lock, shared by every producer-consumer engine.
+    latencies = sorted(latencies)
+    return {
+        'produced': produced,
+        'consumed': consumed,
+        'elapsed': elapsed,
+        'items_per_sec': consumed / elapsed if elapsed else 0.0,
+        'latency_p50': percentile(latencies, 50),
+        'latency_p99': percentile(latencies, 99),
+        'lock_acquires': acquires,
+        'lock_wait': lock_wait,
+        'lock_wait_mean': lock_wait / acquires if acquires else 0.0,
+    }
+
+def print_benchmark(stats):
+    print(f"Items: {stats['consumed']} consumed, {stats['produced']} produced in {stats['elapsed']:.2f} s "
+          f"({stats['items_per_sec']:,.0f} items/s)")
+    print(f"Latency: p50 {stats['latency_p50'] * 1e6:.1f} us, p99 {stats['latency_p99'] * 1e6:.1f} us")
+    print(f"Lock: {stats['lock_acquires']} acquires, {stats['lock_wait']:.3f} s waiting "
+          f"({stats['lock_wait_mean'] * 1e6:.2f} us per acquire)")
+
 class ProducerConsumer:
-    def __init__(self, buffer_size=5):
+    # With benchmark=True the producers and consumers run flat out: no sleeps,
+    # no printing, up to `batch_size` items moved per lock acquisition, and
+    # each item is its enqueue time so consumers can measure its latency.
+    # Benchmark mode waits on conditions over the buffer lock instead of the
+    # counting semaphores, so a whole batch takes one acquisition. `lock`
+    # replaces the buffer lock, e.g. with an InstrumentedLock from rwlock.py.
+    def __init__(self, buffer_size=5, benchmark=False, batch_size=1, lock=None):
         self.buffer = deque(maxlen=buffer_size)
         self.buffer_size = buffer_size
-        self.mutex = threading.Lock()
+        self.mutex = lock if lock is not None else threading.Lock()
         self.empty = threading.Semaphore(buffer_size)
         self.full = threading.Semaphore(0)
         self.running = True
+        self.benchmark = benchmark
+        self.batch_size = max(1, batch_size)
+        self.not_full = threading.Condition(self.mutex)
+        self.not_empty = threading.Condition(self.mutex)
+        self.stats = None
 
     def producer(self, pid):
         while self.running:
@@ -97,9 +196,53 @@ class ProducerConsumer:
             self.empty.release()
             time.sleep(random.uniform(0.2, 0.7))
 
+    def bench_producer(self, pid, result):
+        buffer, capacity, batch = self.buffer, self.buffer_size, self.batch_size
+        clock = time.perf_counter
+        produced = acquires = 0
+        lock_wait = 0.0
+        while self.running:
+            requested = clock()
+            with self.mutex:
+                lock_wait += clock() - requested
+                acquires += 1
+                while len(buffer) >= capacity and self.running:
+                    self.not_full.wait()
+                if not self.running:
+                    break
+                n = min(batch, capacity - len(buffer))
+                buffer.extend([clock()] * n)
+                self.not_empty.notify(n)
+            produced += n
+        result.update(produced=produced, acquires=acquires, lock_wait=lock_wait)
+
+    def bench_consumer(self, pid, result):
+        buffer, batch = self.buffer, self.batch_size
+        clock = time.perf_counter
+        latencies = array('d')
+        acquires = 0
+        lock_wait = 0.0
+        while True:
+            requested = clock()
+            with self.mutex:
+                lock_wait += clock() - requested
+                acquires += 1
+                while not buffer and self.running:
+                    self.not_empty.wait()
+                if not self.running:
+                    break
+                n = min(batch, len(buffer))
+                items = [buffer.popleft() for _ in range(n)]
+                self.not_full.notify(n)
+            now = clock()
+            latencies.extend(now - enqueued for enqueued in items)
+        result.update(latencies=latencies, acquires=acquires, lock_wait=lock_wait)
+
     def start(self, num_producers=1, num_consumers=1, duration=5):
         threads = []
         self.running = True
+        if self.benchmark:
+            return self._start_benchmark(num_producers, num_consumers, duration)
         for i in range(num_producers):
             t = threading.Thread(target=self.producer, args=(i+1,))
             t.start()
@@ -118,31 +261,149 @@ class ProducerConsumer:
             t.join()
         print("Producer-Consumer simulation complete.")
 
+    def _start_benchmark(self, num_producers, num_consumers, duration):
+        self.buffer.clear()
+        producers = [{} for _ in range(num_producers)]
+        consumers = [{} for _ in range(num_consumers)]
+        threads = [threading.Thread(target=self.bench_producer, args=(i+1, r)) for i, r in enumerate(producers)]
+        threads += [threading.Thread(target=self.bench_consumer, args=(i+1, r)) for i, r in enumerate(consumers)]
+        began = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        with self.mutex:
+            self.running = False
+            self.not_full.notify_all()
+            self.not_empty.notify_all()
+        elapsed = time.perf_counter() - began
+        for t in threads:
+            t.join()
+        latencies = array('d')
+        for r in consumers:
+            latencies.extend(r['latencies'])
+        results = producers + consumers
+        self.stats = benchmark_summary(sum(r['produced'] for r in producers), len(latencies), elapsed, latencies,
+                                       sum(r['acquires'] for r in results), sum(r['lock_wait'] for r in results))
+        return self.stats
+
 # ---------------------- Shell Interface ----------------------
 
+def make_memory_manager(num_frames, algo, allocation='global', reference_string=None):
+    # Global replacement is plain MemoryManager; the local policies live in allocation.py.
+    if allocation == 'global':
+        return MemoryManager(num_frames, algo, reference_string)
+    from allocation import PerProcessMemoryManager
+    return PerProcessMemoryManager(num_frames, algo, allocation, reference_string)
+
 def memory_management_demo():
     print("\n--- Memory Management Demo ---")
     num_frames = int(input("Enter number of memory frames: "))
-    algo = input("Choose page replacement algorithm (FIFO/LRU): ").strip().upper()
-    mm = MemoryManager(num_frames, algo)
+    algo = input(f"Choose page replacement algorithm ({'/'.join(POLICIES)}): ").strip().upper()
+    if algo not in POLICIES:
+        print("Unknown replacement algorithm.")
+        return
+    allocation = input("Frame allocation (global/equal/proportional/pff, blank = global): ").strip().lower() or 'global'
+    if allocation != 'global':
+        from allocation import ALLOCATIONS
+        if allocation not in ALLOCATIONS:
+            print("Unknown allocation policy.")
+            return
     num_processes = int(input("Enter number of processes: "))
-    for pid in range(1, num_processes+1):
-        pages = input(f"Enter page requests for process {pid} (space-separated): ").split()
-        for page in pages:
-            mm.request_page(pid, int(page))
+    if algo == 'OPT':
+        # OPT looks ahead, so read every request before running any.
+        requests = []
+        for pid in range(1, num_processes+1):
+            pages = input(f"Enter page requests for process {pid} (space-separated): ").split()
+            requests.extend((pid, int(page)) for page in pages)
+        mm = make_memory_manager(num_frames, algo, allocation, requests)
+        for pid, page in requests:
+            mm.request_page(pid, page)
             mm.show_memory()
+    else:
+        mm = make_memory_manager(num_frames, algo, allocation)
+        for pid in range(1, num_processes+1):
+            pages = input(f"Enter page requests for process {pid} (space-separated): ").split()
+            for page in pages:
+                mm.request_page(pid, int(page))
+                mm.show_memory()
     print(f"Total page faults: {mm.page_faults}")
     mm.show_memory()
+    if allocation != 'global':
+        mm.print_report()
     print("--- End of Memory Management Demo ---\n")
 
+def trace_replay_demo():
+    # paging_trace imports this module, so import it only when needed.
+    from paging_trace import read_trace, lru_fault_curve, print_curve
+    print("\n--- Page Trace Replay ---")
+    path = input("Enter trace file ('pid page' or 'page' per line): ").strip()
+    algo = input(f"Choose page replacement algorithm ({'/'.join(POLICIES)}, or MRC for the LRU curve): ").strip().upper()
+    try:
+        if algo == 'MRC':
+            print_curve(lru_fault_curve(read_trace(path)))
+        elif algo in POLICIES:
+            num_frames = int(input("Enter number of memory frames: "))
+            refs = list(read_trace(path)) if algo == 'OPT' else None
+            mm = MemoryManager(num_frames, algo, refs)
+            result = mm.replay(refs if refs is not None else read_trace(path))
+            print(f"References: {result['references']}  Page faults: {result['faults']}  "
+                  f"Fault rate: {result['fault_rate']:.2%}")
+        else:
+            print("Unknown replacement algorithm.")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+    print("--- End of Page Trace Replay ---\n")
+
+def address_translation_demo():
+    # address_translation imports this module, so import it only when needed.
+    from address_translation import MMU, read_va_trace
+    print("\n--- Address Translation Demo ---")
+    try:
+        page_size = int(input("Enter page size in bytes (power of two, e.g. 4096): "))
+        levels = int(input("Enter number of page-table levels (2-4): "))
+        va_bits = int(input("Enter virtual address bits (e.g. 32 or 48): "))
+        sets = int(input("Enter TLB sets: "))
+        ways = int(input("Enter TLB ways per set: "))
+        num_frames = int(input("Enter number of physical frames: "))
+        algo = input(f"Choose page replacement algorithm ({'/'.join(p for p in POLICIES if p != 'OPT')}): ").strip().upper()
+        mmu = MMU(MemoryManager(num_frames, algo), page_size, levels, va_bits, sets, ways)
+        path = input("Enter virtual address trace file (blank = type addresses): ").strip()
+        if path:
+            mmu.run(read_va_trace(path))
+        else:
+            addresses = input("Enter virtual addresses for process 1 (space-separated, hex allowed): ").split()
+            for va in addresses:
+                pa, tlb_hit, depth, fault = mmu.translate(1, int(va, 0))
+                how = "TLB hit" if tlb_hit else f"TLB miss, walked {depth} level(s)" + (", page fault" if fault else "")
+                print(f"VA {int(va, 0):#x} -> PA {pa:#x} ({how})")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return
+    mmu.print_stats()
+    print("--- End of Address Translation Demo ---\n")
+
 def producer_consumer_demo():
     print("\n--- Producer-Consumer Synchronization Demo ---")
     buffer_size = int(input("Enter buffer size: "))
     num_producers = int(input("Number of producers: "))
     num_consumers = int(input("Number of consumers: "))
     duration = int(input("Simulation duration (seconds): "))
-    pc = ProducerConsumer(buffer_size)
-    pc.start(num_producers, num_consumers, duration)
+    if input("Benchmark mode (no sleeps or prints)? (y/n): ").strip().lower() == 'y':
+        batch_size = int(input("Items per lock acquisition (batch size): ") or 1)
+        engine = input("Run as threads, processes over shared memory, or asyncio tasks? "
+                       "(threads/shm/async, blank = threads): ").strip().lower()
+        if engine == 'shm':
+            from shm_ring import SharedRingProducerConsumer
+            pc = SharedRingProducerConsumer(buffer_size, batch_size)
+        elif engine == 'async':
+            from async_pc import AsyncProducerConsumer
+            pc = AsyncProducerConsumer(buffer_size, batch_size)
+        else:
+            pc = ProducerConsumer(buffer_size, benchmark=True, batch_size=batch_size)
+        print_benchmark(pc.start(num_producers, num_consumers, duration))
+    else:
+        pc = ProducerConsumer(buffer_size)
+        pc.start(num_producers, num_consumers, duration)
     print("--- End of Producer-Consumer Demo ---\n")
 
 def main():
@@ -150,13 +411,19 @@ def main():
         print("\n==== Shell Menu ====")
         print("1. Memory Management (Paging)")
         print("2. Process Synchronization (Producer-Consumer)")
-        print("3. Exit")
+        print("3. Replay Page Reference Trace (bulk)")
+        print("4. Address Translation (TLB + Multi-Level Page Table)")
+        print("5. Exit")
         choice = input("Select an option: ")
         if choice == '1':
             memory_management_demo()
         elif choice == '2':
             producer_consumer_demo()
         elif choice == '3':
+            trace_replay_demo()
+        elif choice == '4':
+            address_translation_demo()
+        elif choice == '5':
             print("Exiting shell.")
             break
         else:
@@ -0,0 +1,195 @@
+# Multiprocess producer-consumer over a shared-memory ring buffer
+#
+# ProducerConsumer runs its producers and consumers as threads, so under the
+# GIL extra consumers never add CPU throughput. SharedRingProducerConsumer
+# runs each of them as a separate process instead. They share a fixed-slot
+# ring buffer in multiprocessing.shared_memory:
+#
+#     offset 0   head (next slot to write, int64)
+#     offset 8   tail (next slot to read, int64)
+#     offset 64  `buffer_size` records of RECORD.size bytes
+#
+# A record is (producer id, sequence number, enqueue time), packed with
+# struct, so nothing is pickled on the data path. Two cross-process
+# semaphores count the empty and full slots. Producers advance the head under
+# one lock and consumers advance the tail under another, so a producer and a
+# consumer never wait for each other's lock. Like benchmark mode in
+# ProducerConsumer, up to `batch_size` records move per lock acquisition and
+# start() returns the same throughput, latency and lock-wait metrics.
+#
+#     python3 shm_ring.py --producers 2 --consumers 2 --buffer 256 --batch 16 --duration 2
+
+import argparse
+import multiprocessing
+import queue
+import struct
+import time
+from array import array
+from multiprocessing import shared_memory
+
+from shell_mem_sync import benchmark_summary, print_benchmark
+
+INDEX = struct.Struct('q')
+RECORD = struct.Struct('qqd')  # producer id, sequence number, enqueue time
+HEAD = 0
+TAIL = 8
+DATA = 64
+POLL = 0.05  # seconds between checks of the stop event while blocked
+RESULT_TIMEOUT = 5  # seconds to wait for a worker's result after it was told to stop
+
+# time.monotonic is system-wide, so timestamps compare across processes.
+clock = time.monotonic
+
+def _producer(name, slots, pid, batch, empty, full, head_lock, stop, results):
+    produced = acquires = 0
+    lock_wait = 0.0
+    error = None
+    shm = shared_memory.SharedMemory(name=name)
+    buf = shm.buf
+    try:
+        while not stop.is_set():
+            if not empty.acquire(timeout=POLL):
+                continue
+            n = 1
+            while n < batch and empty.acquire(False):
+                n += 1
+            requested = clock()
+            with head_lock:
+                lock_wait += clock() - requested
+                acquires += 1
+                head = INDEX.unpack_from(buf, HEAD)[0]
+                now = clock()
+                for i in range(n):
+                    RECORD.pack_into(buf, DATA + (head + i) % slots * RECORD.size, pid, produced + i, now)
+                INDEX.pack_into(buf, HEAD, head + n)
+            produced += n
+            for _ in range(n):
+                full.release()
+    except BaseException as e:
+        error = f"producer {pid}: {e!r}"
+        raise
+    finally:
+        del buf
+        shm.close()
+        # Always report back, so the parent never waits for a result that will not come.
+        results.put((produced, acquires, lock_wait, b'', error))
+
+def _consumer(name, slots, pid, batch, empty, full, tail_lock, stop, results):
+    latencies = array('d')
+    acquires = 0
+    lock_wait = 0.0
+    error = None
+    shm = shared_memory.SharedMemory(name=name)
+    buf = shm.buf
+    try:
+        while not stop.is_set():
+            if not full.acquire(timeout=POLL):
+                continue
+            n = 1
+            while n < batch and full.acquire(False):
+                n += 1
+            requested = clock()
+            with tail_lock:
+                lock_wait += clock() - requested
+                acquires += 1
+                tail = INDEX.unpack_from(buf, TAIL)[0]
+                enqueued = [RECORD.unpack_from(buf, DATA + (tail + i) % slots * RECORD.size)[2] for i in range(n)]
+                INDEX.pack_into(buf, TAIL, tail + n)
+            for _ in range(n):
+                empty.release()
+            now = clock()
+            latencies.extend(now - t for t in enqueued)
+    except BaseException as e:
+        error = f"consumer {pid}: {e!r}"
+        raise
+    finally:
+        del buf
+        shm.close()
+        results.put((0, acquires, lock_wait, latencies.tobytes(), error))
+
+class SharedRingProducerConsumer:
+    def __init__(self, buffer_size=5, batch_size=1):
+        self.buffer_size = buffer_size
+        self.batch_size = max(1, batch_size)
+        self.stats = None
+
+    def start(self, num_producers=1, num_consumers=1, duration=5):
+        ctx = multiprocessing.get_context()
+        shm = shared_memory.SharedMemory(create=True, size=DATA + self.buffer_size * RECORD.size)
+        try:
+            INDEX.pack_into(shm.buf, HEAD, 0)
+            INDEX.pack_into(shm.buf, TAIL, 0)
+            empty = ctx.Semaphore(self.buffer_size)
+            full = ctx.Semaphore(0)
+            head_lock = ctx.Lock()
+            tail_lock = ctx.Lock()
+            stop = ctx.Event()
+            results = ctx.Queue()
+            workers = [ctx.Process(target=_producer, args=(shm.name, self.buffer_size, i+1, self.batch_size,
+                                                           empty, full, head_lock, stop, results))
+                       for i in range(num_producers)]
+            workers += [ctx.Process(target=_consumer, args=(shm.name, self.buffer_size, i+1, self.batch_size,
+                                                            empty, full, tail_lock, stop, results))
+                        for i in range(num_consumers)]
+            for w in workers:
+                w.start()
+            began = clock()
+            time.sleep(duration)
+            stop.set()
+            elapsed = clock() - began
+            # Collect the results before joining: a worker cannot exit until
+            # its queued result has been read.
+            produced = acquires = 0
+            lock_wait = 0.0
+            latencies = array('d')
+            errors = []
+            pending = len(workers)
+            deadline = clock() + RESULT_TIMEOUT
+            while pending:
+                try:
+                    n, a, wait, data, error = results.get(timeout=POLL)
+                except queue.Empty:
+                    # Every worker reports from a `finally`, but one that dies
+                    # before it gets there (killed, or unable to attach to the
+                    # segment) never will.
+                    if all(w.exitcode is not None for w in workers) and results.empty():
+                        errors.append(f"{pending} worker(s) exited without a result")
+                        break
+                    if clock() > deadline:
+                        errors.append(f"{pending} worker(s) did not stop within {RESULT_TIMEOUT} s")
+                        break
+                    continue
+                pending -= 1
+                produced += n
+                acquires += a
+                lock_wait += wait
+                latencies.frombytes(data)
+                if error:
+                    errors.append(error)
+            for w in workers:
+                w.join(RESULT_TIMEOUT if not errors else POLL)
+                if w.is_alive():
+                    w.terminate()
+                    w.join()
+        finally:
+            stop.set()
+            shm.close()
+            shm.unlink()
+        if errors:
+            raise RuntimeError("shared-memory producer-consumer failed: " + "; ".join(errors))
+        self.stats = benchmark_summary(produced, len(latencies), elapsed, latencies, acquires, lock_wait)
+        return self.stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Producer-consumer across processes over shared memory.")
+    parser.add_argument('--producers', type=int, default=1)
+    parser.add_argument('--consumers', type=int, default=1)
+    parser.add_argument('--buffer', type=int, default=256, help="Ring buffer slots (default 256).")
+    parser.add_argument('--batch', type=int, default=1, help="Records per lock acquisition (default 1).")
+    parser.add_argument('--duration', type=float, default=2, help="Seconds to run (default 2).")
+    args = parser.parse_args()
+    pc = SharedRingProducerConsumer(args.buffer, args.batch)
+    print_benchmark(pc.start(args.producers, args.consumers, args.duration))
+
+if __name__ == "__main__":
+    main()